@@ -13,6 +13,8 @@ from scipy import stats
 import statsmodels.api as sm
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
+import matplotlib
+matplotlib.use('Agg')  # Non-interactive backend; avoids Tk/Qt init in batch runs
 import matplotlib.pyplot as plt
 import seaborn as sns
 
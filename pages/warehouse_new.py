@@ -14,9 +14,20 @@ from utils.sqlite_database import (
     get_items_low_stock
 )
 
+SAMPLE_ITEMS = (
+    ("Beras Premium", "Beras", 500, 50, 1000, "kg", 15000),
+    ("Jagung Manis", "Jagung", 300, 30, 600, "kg", 8000),
+    ("Kedelai Hitam", "Kacang-kacangan", 200, 20, 400, "kg", 12000),
+    ("Cabai Merah", "Sayuran", 100, 10, 200, "kg", 25000),
+    ("Tomat Segar", "Sayuran", 150, 15, 300, "kg", 18000)
+)
+
 def app():
     require_auth()
     
+    # Role is fixed for the lifetime of a login; cached so reruns skip the lookup
+    is_admin = st.session_state.setdefault('_is_admin', st.session_state['user']['role'] == 'admin')
+    
     st.title("🏪 Manajemen Lumbung Desa")
     
     # Add new item section
@@ -142,7 +153,8 @@ def app():
         
         # Format the dataframe for display
         display_df = items_df.copy()
-        display_df['harga'] = display_df['price_per_unit'].apply(lambda x: f"Rp {x:,.0f}" if pd.notna(x) else "Rp 0")
+        prices = display_df['price_per_unit'].fillna(0).round().astype('int64')
+        display_df['harga'] = 'Rp ' + prices.map('{:,}'.format)
         display_df['stok'] = display_df.apply(lambda row: f"{row['current_stock']} {row['unit']}", axis=1)
         
         # Status color coding
@@ -308,22 +320,14 @@ def app():
         st.info("📭 Tidak ada item yang ditemukan dengan filter yang dipilih.")
         
         # Add sample data button for admin users
-        if st.session_state['user']['role'] == 'admin':
+        if is_admin:
             if st.button("📊 Tambah Data Sampel", use_container_width=True):
                 # Add sample items
                 warehouses = get_warehouses()
                 if warehouses:
                     warehouse_id = warehouses[0]['id']
                     
-                    sample_items = [
-                        ("Beras Premium", "Beras", 500, 50, 1000, "kg", 15000),
-                        ("Jagung Manis", "Jagung", 300, 30, 600, "kg", 8000),
-                        ("Kedelai Hitam", "Kacang-kacangan", 200, 20, 400, "kg", 12000),
-                        ("Cabai Merah", "Sayuran", 100, 10, 200, "kg", 25000),
-                        ("Tomat Segar", "Sayuran", 150, 15, 300, "kg", 18000)
-                    ]
-                    
-                    for name, category, stock, min_stock, max_stock, unit, price in sample_items:
+                    for name, category, stock, min_stock, max_stock, unit, price in SAMPLE_ITEMS:
                         create_item(name, category, stock, min_stock, max_stock, unit, price, warehouse_id)
                     
                     st.success("✅ Data sampel berhasil ditambahkan!")
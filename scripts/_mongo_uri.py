@@ -0,0 +1,116 @@
+"""
+Helper koneksi MongoDB yang dipakai bersama oleh script debug/fix koneksi:
+builder connection string, analisis MONGODB_SETTINGS, probe TCP dan resolver DNS
+"""
+
+import errno
+import os
+import re
+import select
+import socket
+import time
+import urllib.parse
+from dataclasses import dataclass
+from functools import lru_cache
+from config import MONGODB_SETTINGS
+
+# Timeout probe TCP (detik), bisa di-override lewat environment
+DEBUG_TCP_PROBE_S = float(os.getenv('DEBUG_TCP_PROBE_S', 2.0))
+
+# Kode connect_ex untuk koneksi non-blocking yang masih berjalan (POSIX dan Windows)
+_CONNECT_IN_PROGRESS = {0, errno.EINPROGRESS, errno.EWOULDBLOCK, getattr(errno, 'WSAEWOULDBLOCK', errno.EWOULDBLOCK)}
+
+# Karakter password yang wajib di-URL-encode dalam connection string
+_SPECIAL_CHARS_RE = re.compile(r"[@:/?#\[\]%]")
+
+@lru_cache(maxsize=4)
+def build_uri(host, username, password, database, port, auth_source, is_srv):
+    """Susun connection string MongoDB; return (connection_string, versi dengan password disamarkan)"""
+    if not (username and password):
+        # Local MongoDB without authentication
+        connection_string = f"mongodb://{host}:{port}"
+        return connection_string, connection_string
+    
+    masked_password = '*' * len(password)
+    if is_srv:
+        # MongoDB Atlas: URL encode password untuk special characters
+        def uri(secret):
+            return f"mongodb+srv://{username}:{secret}@{host}/{database}?retryWrites=true&w=majority&appName=Cluster0"
+        return uri(urllib.parse.quote_plus(password)), uri(masked_password)
+    
+    # Local MongoDB with authentication
+    def uri(secret):
+        return f"mongodb://{username}:{secret}@{host}:{port}/{auth_source}"
+    return uri(password), uri(masked_password)
+
+def build_uri_from_settings(settings, is_srv):
+    """Panggil build_uri dengan nilai dari dict MONGODB_SETTINGS"""
+    return build_uri(
+        settings.get('host', ''),
+        settings.get('username', ''),
+        settings.get('password', ''),
+        settings.get('database', ''),
+        settings.get('port'),
+        settings.get('auth_source'),
+        is_srv,
+    )
+
+@dataclass(frozen=True)
+class SettingsReport:
+    """Hasil analisis MONGODB_SETTINGS yang dipakai bersama oleh semua pengecekan"""
+    host: str
+    is_cloud: bool
+    needs_encoding: bool
+    missing: tuple
+
+@lru_cache(maxsize=1)
+def _analyze_settings():
+    """Analisis MONGODB_SETTINGS sekali saja untuk seluruh run"""
+    host = MONGODB_SETTINGS.get('host', '') or ''
+    is_cloud = 'mongodb.net' in host
+    password = MONGODB_SETTINGS.get('password', '')
+    needs_encoding = bool(password) and _SPECIAL_CHARS_RE.search(password) is not None
+    missing = tuple(
+        field for field in ('username', 'password', 'database')
+        if is_cloud and not MONGODB_SETTINGS.get(field, '')
+    )
+    return SettingsReport(host=host, is_cloud=is_cloud, needs_encoding=needs_encoding, missing=missing)
+
+def _tcp_probe(host, port, timeout=DEBUG_TCP_PROBE_S):
+    """TCP connect non-blocking + select agar port yang difilter gagal cepat; return 0 jika sukses"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        sock.setblocking(False)
+        result = sock.connect_ex((host, port))
+        if result not in _CONNECT_IN_PROGRESS:
+            return result
+        _, writable, _ = select.select([], [sock], [], timeout)
+        if not writable:
+            return errno.ETIMEDOUT
+        return sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+    finally:
+        sock.close()
+
+@lru_cache(maxsize=1)
+def _get_resolver():
+    """Resolver DNS bersama dengan cache, dibuat sekali (dnspython diimport secara lazy)"""
+    import dns.resolver
+    
+    resolver = dns.resolver.Resolver()
+    resolver.cache = dns.resolver.LRUCache(100)
+    resolver.lifetime = 3.0
+    resolver.timeout = 2.0
+    return resolver
+
+def _resolve_with_retry(name, rdtype, attempts=3):
+    """Resolve DNS dengan retry backoff eksponensial, hanya untuk timeout (bukan NXDOMAIN)"""
+    import dns.exception
+    
+    for attempt in range(attempts):
+        try:
+            return _get_resolver().resolve(name, rdtype)
+        except dns.exception.Timeout:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.2 * 2 ** attempt)
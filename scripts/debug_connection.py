@@ -7,12 +7,21 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import atexit
+import functools
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pymongo
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError, OperationFailure
 import logging
 from config import MONGODB_SETTINGS
-import urllib.parse
+from utils.thread_output import ThreadOutput
+from scripts._mongo_uri import (
+    build_uri_from_settings,
+    _analyze_settings,
+    _resolve_with_retry,
+    _tcp_probe,
+)
 
 # Configure detailed logging
 logging.basicConfig(
@@ -21,6 +30,47 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Timeout untuk debugging: gagal cepat daripada menunggu default 30 detik PyMongo
+DEBUG_SERVER_SELECTION_MS = int(os.getenv('DEBUG_SERVER_SELECTION_MS', 2000))
+DEBUG_CONNECT_MS = int(os.getenv('DEBUG_CONNECT_MS', 3000))
+DEBUG_SOCKET_MS = int(os.getenv('DEBUG_SOCKET_MS', 3000))
+
+# Semua client yang pernah dibuat, agar bisa ditutup sekali saat proses selesai
+_OPEN_CLIENTS = []
+
+@functools.lru_cache(maxsize=8)
+def _cached_client(pid, connection_string, options):
+    """Buat MongoClient sekali per (proses, connection string, opsi)"""
+    client = MongoClient(connection_string, **dict(options))
+    _OPEN_CLIENTS.append((pid, client))
+    return client
+
+def _get_client(connection_string, **kwargs):
+    """Ambil MongoClient yang sudah di-cache supaya DNS SRV, TLS dan pool tidak dibangun ulang"""
+    # PID ikut jadi key: client PyMongo tidak fork-safe, child process butuh client sendiri
+    return _cached_client(os.getpid(), connection_string, tuple(sorted(kwargs.items())))
+
+def _close_all_clients():
+    """Tutup semua client cache milik proses ini"""
+    pid = os.getpid()
+    for owner_pid, client in _OPEN_CLIENTS:
+        if owner_pid == pid:
+            client.close()
+    _OPEN_CLIENTS.clear()
+    _cached_client.cache_clear()
+
+atexit.register(_close_all_clients)
+
+def _run_probe(output, test_name, test_func):
+    """Jalankan satu probe dan kembalikan (name, ok, detail)"""
+    output.capture()
+    try:
+        ok = test_func()
+    except Exception as e:
+        print(f"❌ Test failed with error: {e}")
+        ok = False
+    return test_name, ok, output.release()
+
 def analyze_environment():
     """Analisis konfigurasi environment"""
     print("=" * 60)
@@ -35,18 +85,18 @@ def analyze_environment():
     print(f"📋 MONGODB_AUTH_SOURCE: {MONGODB_SETTINGS['auth_source']}")
     
     # Detect connection type
-    is_cloud = 'mongodb.net' in MONGODB_SETTINGS['host']
-    print(f"☁️  Connection Type: {'CLOUD (MongoDB Atlas)' if is_cloud else 'LOCAL'}")
+    report = _analyze_settings()
+    print(f"☁️  Connection Type: {'CLOUD (MongoDB Atlas)' if report.is_cloud else 'LOCAL'}")
     
     # Validate required fields
     issues = []
-    if not MONGODB_SETTINGS['host']:
+    if not report.host:
         issues.append("❌ MONGODB_HOST kosong")
     if not MONGODB_SETTINGS['database']:
         issues.append("❌ MONGODB_DATABASE kosong")
-    if is_cloud and not MONGODB_SETTINGS['username']:
+    if 'username' in report.missing:
         issues.append("❌ MongoDB Cloud memerlukan username")
-    if is_cloud and not MONGODB_SETTINGS['password']:
+    if 'password' in report.missing:
         issues.append("❌ MongoDB Cloud memerlukan password")
     
     if issues:
@@ -58,35 +108,37 @@ def analyze_environment():
     
     return len(issues) == 0
 
-def build_connection_string():
-    """Build dan validate connection string"""
+def _connection_string():
+    """Ambil connection string (di-cache oleh build_uri); return (connection_string, versi tersamar, jenis koneksi)"""
+    is_cloud = _analyze_settings().is_cloud
+    connection_string, masked_string = build_uri_from_settings(MONGODB_SETTINGS, is_cloud)
+    if not (MONGODB_SETTINGS['username'] and MONGODB_SETTINGS['password']):
+        kind = "🏠 Using Local MongoDB without authentication"
+    elif is_cloud:
+        kind = "☁️  Using MongoDB Atlas connection string"
+    else:
+        kind = "🏠 Using Local MongoDB connection string"
+    return connection_string, masked_string, kind
+
+def _log_connection_string(masked_string, kind):
+    """Tampilkan connection string (password disamarkan)"""
     print("\n" + "=" * 60)
     print("🔗 BUILDING CONNECTION STRING")
     print("=" * 60)
-    
+    print(kind)
+    print(f"🔗 Connection String: {masked_string}")
+
+def build_connection_string(verbose=True):
+    """Build dan validate connection string"""
     try:
-        if MONGODB_SETTINGS['username'] and MONGODB_SETTINGS['password']:
-            if 'mongodb.net' in MONGODB_SETTINGS['host']:
-                # MongoDB Atlas connection string
-                # URL encode password untuk special characters
-                encoded_password = urllib.parse.quote_plus(MONGODB_SETTINGS['password'])
-                connection_string = f"mongodb+srv://{MONGODB_SETTINGS['username']}:{encoded_password}@{MONGODB_SETTINGS['host']}/{MONGODB_SETTINGS['database']}?retryWrites=true&w=majority&appName=Cluster0"
-                print("☁️  Using MongoDB Atlas connection string")
-            else:
-                # Local MongoDB with authentication
-                connection_string = f"mongodb://{MONGODB_SETTINGS['username']}:{MONGODB_SETTINGS['password']}@{MONGODB_SETTINGS['host']}:{MONGODB_SETTINGS['port']}/{MONGODB_SETTINGS['auth_source']}"
-                print("🏠 Using Local MongoDB connection string")
-        else:
-            # Local MongoDB without authentication
-            connection_string = f"mongodb://{MONGODB_SETTINGS['host']}:{MONGODB_SETTINGS['port']}"
-            print("🏠 Using Local MongoDB without authentication")
-        
-        print(f"🔗 Connection String: {connection_string.replace(MONGODB_SETTINGS['password'], '*' * len(MONGODB_SETTINGS['password'])) if MONGODB_SETTINGS['password'] else connection_string}")
-        return connection_string
-        
+        connection_string, masked_string, kind = _connection_string()
     except Exception as e:
         print(f"❌ Error building connection string: {e}")
         return None
+    
+    if verbose:
+        _log_connection_string(masked_string, kind)
+    return connection_string
 
 def test_basic_connection():
     """Test koneksi dasar dengan berbagai approaches"""
@@ -101,12 +153,13 @@ def test_basic_connection():
     try:
         print("🔄 Attempting connection...")
         
-        # Test dengan timeout yang lebih panjang untuk cloud
-        client = MongoClient(
+        # serverSelectionTimeoutMS harus diset eksplisit, connectTimeoutMS saja tidak cukup
+        # (TCP keepalive sudah aktif secara default di PyMongo 4)
+        client = _get_client(
             connection_string,
-            serverSelectionTimeoutMS=10000,  # 10 detik
-            connectTimeoutMS=15000,          # 15 detik
-            socketTimeoutMS=15000,          # 15 detik
+            serverSelectionTimeoutMS=DEBUG_SERVER_SELECTION_MS,
+            connectTimeoutMS=DEBUG_CONNECT_MS,
+            socketTimeoutMS=DEBUG_SOCKET_MS,
             retryWrites=True,
             retryReads=True,
             maxPoolSize=1,  # Minimal untuk testing
@@ -126,10 +179,7 @@ def test_basic_connection():
         collections = db.list_collection_names()
         print(f"✅ Database accessible, {len(collections)} collections found")
         
-        # Close connection
-        client.close()
-        print("✅ Connection closed successfully")
-        
+        # Client tidak ditutup di sini; pool dipakai ulang dan ditutup saat exit
         return True
         
     except ServerSelectionTimeoutError as e:
@@ -167,7 +217,7 @@ def test_dns_resolution():
     print("🌍 TESTING DNS RESOLUTION")
     print("=" * 60)
     
-    if 'mongodb.net' not in MONGODB_SETTINGS['host']:
+    if not _analyze_settings().is_cloud:
         print("ℹ️  Skipping DNS test (not using MongoDB Atlas)")
         return True
     
@@ -186,7 +236,7 @@ def test_dns_resolution():
         srv_record = f"_mongodb._tcp.{host}"
         print(f"🔍 Checking SRV record: {srv_record}")
         
-        answers = dns.resolver.resolve(srv_record, 'SRV')
+        answers = _resolve_with_retry(srv_record, 'SRV')
         print(f"✅ SRV Record found:")
         for answer in answers:
             print(f"   {answer}")
@@ -196,7 +246,7 @@ def test_dns_resolution():
         print(f"🔍 Checking TXT record: {txt_record}")
         
         try:
-            txt_answers = dns.resolver.resolve(txt_record, 'TXT')
+            txt_answers = _resolve_with_retry(txt_record, 'TXT')
             print(f"✅ TXT Record found:")
             for answer in txt_answers:
                 print(f"   {answer}")
@@ -231,24 +281,18 @@ def test_network_connectivity():
     print("🌐 TESTING NETWORK CONNECTIVITY")
     print("=" * 60)
     
-    if 'mongodb.net' not in MONGODB_SETTINGS['host']:
+    if not _analyze_settings().is_cloud:
         print("ℹ️  Skipping network test (not using MongoDB Atlas)")
         return True
     
     try:
-        import socket
-        
         host = MONGODB_SETTINGS['host']
         port = 27017
         
         print(f"🔍 Testing connectivity to {host}:{port}")
         
         # Test TCP connection
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(10)  # 10 detik timeout
-        
-        result = sock.connect_ex((host, port))
-        sock.close()
+        result = _tcp_probe(host, port)
         
         if result == 0:
             print("✅ TCP Connection successful")
@@ -271,15 +315,15 @@ def test_mongodb_atlas_specific():
     print("☁️  TESTING MONGODB ATLAS SPECIFIC")
     print("=" * 60)
     
-    if 'mongodb.net' not in MONGODB_SETTINGS['host']:
+    report = _analyze_settings()
+    if not report.is_cloud:
         print("ℹ️  Skipping Atlas-specific tests (not using MongoDB Atlas)")
         return True
     
     issues = []
     
     # Check password encoding
-    password = MONGODB_SETTINGS['password']
-    if password and any(char in password for char in ['@', ':', '/', '?', '#', '[', ']']):
+    if report.needs_encoding:
         print("⚠️  Password contains special characters that need URL encoding")
         issues.append("Password needs URL encoding")
     else:
@@ -294,7 +338,7 @@ def test_mongodb_atlas_specific():
         print("✅ Database name format looks good")
     
     # Check connection string format
-    if 'appName' not in build_connection_string():
+    if 'appName' not in (build_connection_string(verbose=False) or ''):
         print("⚠️  No appName parameter in connection string")
         issues.append("Missing appName parameter")
     else:
@@ -309,8 +353,8 @@ def test_mongodb_atlas_specific():
     
     return len(issues) == 0
 
-def generate_recommendations():
-    """Generate rekomendasi perbaikan"""
+def generate_recommendations(results):
+    """Generate rekomendasi perbaikan dari hasil tests yang sudah dijalankan main()"""
     print("\n" + "=" * 60)
     print("💡 REKOMENDASI PERBAIKAN")
     print("=" * 60)
@@ -318,27 +362,28 @@ def generate_recommendations():
     recommendations = []
     
     # Analyze configuration
-    if not MONGODB_SETTINGS['username'] and 'mongodb.net' in MONGODB_SETTINGS['host']:
+    report = _analyze_settings()
+    if 'username' in report.missing:
         recommendations.append("🔧 Tambahkan username di .env file")
     
-    if not MONGODB_SETTINGS['password'] and 'mongodb.net' in MONGODB_SETTINGS['host']:
+    if 'password' in report.missing:
         recommendations.append("🔧 Tambahkan password di .env file")
     
-    # Test results will be added by calling functions
+    # Pakai hasil tests yang sudah ada, jangan jalankan ulang probe jaringan
     print("📋 Rekomendasi berdasarkan analisis:")
     
-    if not analyze_environment():
+    if not results.get("Environment Configuration", True):
         recommendations.append("🔧 Perbaiki konfigurasi environment variables")
     
-    if not test_dns_resolution():
+    if not results.get("DNS Resolution", True):
         recommendations.append("🌐 Periksa koneksi internet dan DNS settings")
         recommendations.append("🔧 Verifikasi cluster name di MongoDB Atlas")
     
-    if not test_network_connectivity():
+    if not results.get("Network Connectivity", True):
         recommendations.append("🔥 Whitelist IP address di MongoDB Atlas Network Access")
         recommendations.append("🔧 Periksa firewall settings")
     
-    if not test_mongodb_atlas_specific():
+    if not results.get("MongoDB Atlas Specific", True):
         recommendations.append("🔐 URL encode password jika mengandung special characters")
         recommendations.append("🔧 Tambahkan appName parameter di connection string")
     
@@ -357,23 +402,42 @@ def main():
     print(f"⏰ {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print()
     
-    # Run all tests
-    tests = [
+    # Probe independen (I/O-bound) dijalankan paralel
+    probes = [
         ("Environment Configuration", analyze_environment),
         ("DNS Resolution", test_dns_resolution),
         ("Network Connectivity", test_network_connectivity),
         ("MongoDB Atlas Specific", test_mongodb_atlas_specific),
-        ("Basic Connection", test_basic_connection),
     ]
     
+    original_stdout = sys.stdout
+    output = ThreadOutput(original_stdout)
+    sys.stdout = output
+    details = {}
     results = {}
-    for test_name, test_func in tests:
+    try:
+        with ThreadPoolExecutor(max_workers=len(probes)) as executor:
+            futures = [executor.submit(_run_probe, output, name, func) for name, func in probes]
+            for future in as_completed(futures):
+                test_name, ok, detail = future.result()
+                results[test_name] = ok
+                details[test_name] = detail
+    finally:
+        sys.stdout = original_stdout
+    
+    # Cetak output sesuai urutan semula, bukan urutan selesai
+    for test_name, _ in probes:
         print(f"\n🧪 Running: {test_name}")
-        try:
-            results[test_name] = test_func()
-        except Exception as e:
-            print(f"❌ Test failed with error: {e}")
-            results[test_name] = False
+        print(details[test_name], end="")
+    results = {test_name: results[test_name] for test_name, _ in probes}
+    
+    # Basic connection tetap serial karena bergantung pada hasil DNS
+    print(f"\n🧪 Running: Basic Connection")
+    try:
+        results["Basic Connection"] = test_basic_connection()
+    except Exception as e:
+        print(f"❌ Test failed with error: {e}")
+        results["Basic Connection"] = False
     
     # Summary
     print("\n" + "=" * 60)
@@ -390,7 +454,7 @@ def main():
     print(f"\n📈 Overall: {passed}/{total} tests passed")
     
     # Generate recommendations
-    recommendations = generate_recommendations()
+    recommendations = generate_recommendations(results)
     
     if passed == total:
         print("\n🎉 Semua tests passed! Koneksi MongoDB seharusnya berhasil.")
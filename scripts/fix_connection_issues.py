@@ -8,13 +8,23 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import re
+import tempfile
 import urllib.parse
 from config import MONGODB_SETTINGS
+from scripts._mongo_uri import (
+    build_uri_from_settings,
+    _analyze_settings,
+    _resolve_with_retry,
+    _tcp_probe,
+)
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# MONGODB_PASSWORD line in .env
+_PW_LINE_RE = re.compile(r'^MONGODB_PASSWORD=')
+
 def validate_and_fix_env_file():
     """Validate dan fix .env file configuration"""
     print("🔧 Validating .env file configuration...")
@@ -25,16 +35,15 @@ def validate_and_fix_env_file():
         print("❌ .env file not found!")
         return False
     
-    # Read current .env content
-    with open(env_file_path, 'r') as f:
-        content = f.read()
-    
     issues_found = []
     fixes_applied = []
     
+    report = _analyze_settings()
+    
     # Check 1: Password encoding needed for special characters
     password = MONGODB_SETTINGS.get('password', '')
-    if password and any(char in password for char in ['@', ':', '/', '?', '#', '[', ']', '%']):
+    encoded_password = None
+    if report.needs_encoding:
         issues_found.append("Password contains special characters that need URL encoding")
         print("⚠️  Password contains special characters")
         
@@ -42,18 +51,38 @@ def validate_and_fix_env_file():
         if password != urllib.parse.quote_plus(password):
             print("🔧 Applying URL encoding to password...")
             encoded_password = urllib.parse.quote_plus(password)
-            
-            # Update .env file with encoded password
-            content = re.sub(
-                r'MONGODB_PASSWORD=(.*)',
-                f'MONGODB_PASSWORD={encoded_password}',
-                content
-            )
-            fixes_applied.append("Password URL encoded")
+    
+    # Single pass over .env: rewrite the password line into a temp file and look for appName
+    appname_seen = False
+    password_replaced = False
+    with open(env_file_path, 'r', newline='') as source, tempfile.NamedTemporaryFile(
+        'w', delete=False, dir=os.path.dirname(env_file_path), newline=''
+    ) as tmp:
+        try:
+            for line in source:
+                if 'appName' in line:
+                    appname_seen = True
+                if encoded_password is not None and _PW_LINE_RE.match(line):
+                    ending = line[len(line.rstrip('\r\n')):]
+                    line = f'MONGODB_PASSWORD={encoded_password}{ending}'
+                    password_replaced = True
+                tmp.write(line)
+        except Exception:
+            # Don't leave a half-written temp file next to .env
+            tmp.close()
+            os.unlink(tmp.name)
+            raise
+    
+    # Atomic swap only when the file actually changed
+    if password_replaced:
+        os.replace(tmp.name, env_file_path)
+        fixes_applied.append("Password URL encoded")
+    else:
+        os.unlink(tmp.name)
     
     # Check 2: Missing appName parameter
-    if 'mongodb.net' in MONGODB_SETTINGS.get('host', ''):
-        if 'appName' not in content:
+    if report.is_cloud:
+        if not appname_seen:
             print("🔧 Adding appName parameter for MongoDB Atlas...")
             # This would be handled in the connection string builder
             fixes_applied.append("appName parameter will be added in connection string")
@@ -64,10 +93,8 @@ def validate_and_fix_env_file():
         issues_found.append("Database name starts with underscore")
         print("⚠️  Database name starts with underscore (may cause issues)")
     
-    # Write fixes back to .env if any fixes applied
+    # Report fixes applied to .env
     if fixes_applied:
-        with open(env_file_path, 'w') as f:
-            f.write(content)
         print(f"✅ Applied {len(fixes_applied)} fixes:")
         for fix in fixes_applied:
             print(f"   - {fix}")
@@ -80,7 +107,7 @@ def check_dns_requirements():
     """Check DNS requirements for MongoDB Atlas"""
     print("\n🌍 Checking DNS requirements...")
     
-    if 'mongodb.net' not in MONGODB_SETTINGS.get('host', ''):
+    if not _analyze_settings().is_cloud:
         print("ℹ️  Skipping DNS check (not using MongoDB Atlas)")
         return True
     
@@ -92,7 +119,7 @@ def check_dns_requirements():
         # Test SRV record
         srv_record = f"_mongodb._tcp.{host}"
         try:
-            answers = dns.resolver.resolve(srv_record, 'SRV')
+            answers = _resolve_with_retry(srv_record, 'SRV')
             print(f"✅ SRV record found: {len(answers)} entries")
         except Exception as e:
             print(f"❌ SRV record error: {e}")
@@ -109,24 +136,20 @@ def validate_connection_string_format():
     """Validate connection string format"""
     print("\n🔗 Validating connection string format...")
     
-    host = MONGODB_SETTINGS.get('host', '')
-    username = MONGODB_SETTINGS.get('username', '')
-    password = MONGODB_SETTINGS.get('password', '')
-    database = MONGODB_SETTINGS.get('database', '')
+    report = _analyze_settings()
     
     issues = []
     
     # Check required fields for cloud
-    if 'mongodb.net' in host:
-        if not username:
-            issues.append("Username required for MongoDB Atlas")
-        if not password:
-            issues.append("Password required for MongoDB Atlas")
-        if not database:
-            issues.append("Database name required for MongoDB Atlas")
+    if 'username' in report.missing:
+        issues.append("Username required for MongoDB Atlas")
+    if 'password' in report.missing:
+        issues.append("Password required for MongoDB Atlas")
+    if 'database' in report.missing:
+        issues.append("Database name required for MongoDB Atlas")
     
     # Check host format
-    if 'mongodb.net' in host and not host.endswith('.mongodb.net'):
+    if report.is_cloud and not report.host.endswith('.mongodb.net'):
         issues.append("Host format should end with .mongodb.net")
     
     if issues:
@@ -138,52 +161,47 @@ def validate_connection_string_format():
         print("✅ Connection string format is valid")
         return True
 
-def generate_connection_string():
-    """Generate and display the actual connection string"""
+def _connection_string():
+    """Get the connection string (cached by build_uri); returns (connection_string, masked_string, kind)"""
+    is_cloud = _analyze_settings().is_cloud
+    connection_string, masked_string = build_uri_from_settings(MONGODB_SETTINGS, is_cloud)
+    if not (MONGODB_SETTINGS['username'] and MONGODB_SETTINGS['password']):
+        kind = "✅ Local MongoDB connection string generated (no auth)"
+    elif is_cloud:
+        kind = "✅ MongoDB Atlas connection string generated"
+    else:
+        kind = "✅ Local MongoDB connection string generated"
+    return connection_string, masked_string, kind
+
+def _log_connection_string(masked_string, kind):
+    """Display the connection string with the password masked"""
     print("\n🔗 Generating connection string...")
-    
+    print(kind)
+    print(f"🔗 Connection String: {masked_string}")
+
+def generate_connection_string(verbose=True):
+    """Generate and display the actual connection string"""
     try:
-        if MONGODB_SETTINGS['username'] and MONGODB_SETTINGS['password']:
-            if 'mongodb.net' in MONGODB_SETTINGS['host']:
-                # MongoDB Atlas connection string with proper encoding
-                encoded_password = urllib.parse.quote_plus(MONGODB_SETTINGS['password'])
-                connection_string = f"mongodb+srv://{MONGODB_SETTINGS['username']}:{encoded_password}@{MONGODB_SETTINGS['host']}/{MONGODB_SETTINGS['database']}?retryWrites=true&w=majority&appName=Cluster0"
-                print("✅ MongoDB Atlas connection string generated")
-            else:
-                # Local MongoDB with authentication
-                connection_string = f"mongodb://{MONGODB_SETTINGS['username']}:{MONGODB_SETTINGS['password']}@{MONGODB_SETTINGS['host']}:{MONGODB_SETTINGS['port']}/{MONGODB_SETTINGS['auth_source']}"
-                print("✅ Local MongoDB connection string generated")
-        else:
-            # Local MongoDB without authentication
-            connection_string = f"mongodb://{MONGODB_SETTINGS['host']}:{MONGODB_SETTINGS['port']}"
-            print("✅ Local MongoDB connection string generated (no auth)")
-        
-        # Display masked version for security
-        masked_string = connection_string.replace(MONGODB_SETTINGS['password'], '*' * len(MONGODB_SETTINGS['password'])) if MONGODB_SETTINGS['password'] else connection_string
-        print(f"🔗 Connection String: {masked_string}")
-        
-        return connection_string
-        
+        connection_string, masked_string, kind = _connection_string()
     except Exception as e:
         print(f"❌ Error generating connection string: {e}")
         return None
+    
+    if verbose:
+        _log_connection_string(masked_string, kind)
+    return connection_string
 
 def test_basic_connectivity():
     """Test basic connectivity without full MongoDB connection"""
     print("\n🌐 Testing basic connectivity...")
     
-    host = MONGODB_SETTINGS.get('host', '')
+    report = _analyze_settings()
+    host = report.host
     
-    if 'mongodb.net' in host:
+    if report.is_cloud:
         try:
-            import socket
-            
             print(f"🔍 Testing TCP connection to {host}:27017...")
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(10)
-            
-            result = sock.connect_ex((host, 27017))
-            sock.close()
+            result = _tcp_probe(host, 27017)
             
             if result == 0:
                 print("✅ TCP connection successful")
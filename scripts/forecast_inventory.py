@@ -4,9 +4,42 @@ from datetime import datetime, timedelta
 import os
 import sys
 import warnings
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import PolynomialFeatures
-import statsmodels.api as sm
+from joblib import Parallel, delayed
+
+# Try to import Numba for JIT-compiled forecast kernels
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Fallback no-op decorator when Numba is not installed"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+# Minimum number of items before per-item forecasts are spread across processes
+PARALLEL_MIN_ITEMS = 200
+
+# Simplified EOQ = sqrt(2 * D * S / H) with S=50 and H=0.2 * D; demand cancels out,
+# so the order quantity is a constant int(sqrt(500)) = 22
+EOQ_ORDERING_COST = 50
+EOQ_HOLDING_RATE = 0.2
+_EOQ = int(np.sqrt(2 * EOQ_ORDERING_COST / EOQ_HOLDING_RATE))
+
+# Weights for the combined forecast; trend gets the highest weight. Renormalized
+# over the methods that actually produced a forecast for an item
+METHOD_WEIGHTS = {'trend': 0.4, 'seasonal': 0.3, 'exponential': 0.2, 'average': 0.1}
+
+# Item fields read by the forecast; everything else stays on the server
+ITEM_FIELDS = {'_id': 0, 'id': 1, 'name': 1, 'category': 1,
+               'current_stock': 1, 'min_stock': 1, 'unit': 1}
+
+# Columns exported to the summary report
+SUMMARY_COLUMNS = ['item_name', 'category', 'current_stock', 'min_stock',
+                   'months_to_min_stock', 'recommended_order_qty',
+                   'confidence_level', 'forecast_method']
 
 # Suppress warnings for cleaner output
 warnings.filterwarnings('ignore')
@@ -15,74 +48,235 @@ warnings.filterwarnings('ignore')
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.database import MongoDBConnection
 
-def calculate_trend_forecast(historical_data, periods=12):
-    """Calculate trend-based forecast using linear regression"""
-    try:
-        if len(historical_data) < 3:
-            return None
-            
-        # Prepare data for regression
-        X = np.arange(len(historical_data)).reshape(-1, 1)
-        y = historical_data.values
-        
-        # Fit linear regression
-        model = LinearRegression()
-        model.fit(X, y)
-        
-        # Predict future values
-        future_X = np.arange(len(historical_data), len(historical_data) + periods).reshape(-1, 1)
-        predictions = model.predict(future_X)
-        
-        # Ensure non-negative predictions
-        predictions = np.maximum(predictions, 0)
+def calculate_trend_forecasts(monthly_values_by_item, periods=12):
+    """Calculate trend-based forecasts for all items using linear regression
+
+    Series of equal length share the design matrix, so they are stacked as columns
+    and fitted with one least-squares solve per length instead of one fit per item.
+    Returns a dict of item_id -> forecast for items with at least 3 months of data.
+    """
+    items_by_length = {}
+    for item_id, values in monthly_values_by_item.items():
+        if len(values) >= 3:
+            items_by_length.setdefault(len(values), []).append(item_id)
+    
+    forecasts = {}
+    for n, item_ids in items_by_length.items():
+        Y = np.stack([monthly_values_by_item[item_id] for item_id in item_ids], axis=1)
+        X = np.column_stack([np.ones(n), np.arange(n)])
+        betas = np.linalg.lstsq(X, Y, rcond=None)[0]  # (2, n_items): intercepts, slopes
         
-        return np.sum(predictions)
-    except Exception:
-        return None
+        # Predict future values, ensuring non-negative predictions
+        future_X = np.column_stack([np.ones(periods), np.arange(n, n + periods)])
+        projected = np.maximum(future_X @ betas, 0.0).sum(axis=0)
+        forecasts.update(zip(item_ids, projected.tolist()))
+    return forecasts
+
+@njit(cache=True, fastmath=True)
+def _seasonal_projection(monthly_means, trend_factor):
+    """Sum of monthly averages scaled by the trend factor"""
+    return (monthly_means * trend_factor).sum()
+
+def calculate_seasonal_forecast(values, first_month, periods=12):
+    """Calculate seasonal forecast using moving averages
 
-def calculate_seasonal_forecast(historical_data, periods=12):
-    """Calculate seasonal forecast using moving averages"""
+    values holds consecutive monthly totals; first_month is the calendar month
+    (1-12) of values[0].
+    """
     try:
-        if len(historical_data) < 12:
+        if len(values) < 12:
             return None
             
-        # Calculate monthly averages
-        monthly_data = historical_data.groupby(historical_data.index.month).mean()
+        # Calculate monthly averages over a fixed 12-bin reduction (empty months stay 0)
+        months = (first_month - 1 + np.arange(len(values))) % 12
+        sums = np.bincount(months, weights=values, minlength=12)
+        counts = np.bincount(months, minlength=12)
+        monthly_data = sums / np.maximum(counts, 1)
         
         # Calculate trend
-        if len(historical_data) >= 24:
-            recent_avg = historical_data.tail(12).mean()
-            older_avg = historical_data.head(12).mean()
+        if len(values) >= 24:
+            recent_avg = values[-12:].mean()
+            older_avg = values[:12].mean()
             trend_factor = recent_avg / max(older_avg, 1)
         else:
             trend_factor = 1.1  # Default growth
             
         # Project future consumption
-        projected_monthly = monthly_data * trend_factor
-        
-        return np.sum(projected_monthly)
+        return _seasonal_projection(monthly_data, trend_factor)
     except Exception:
         return None
 
-def calculate_exponential_smoothing_forecast(historical_data, alpha=0.3, periods=12):
+@njit(cache=True, fastmath=True)
+def _exponential_smoothing_last(values, alpha):
+    """Return the last simple-exponential-smoothing level of values"""
+    smoothed = values[0]
+    for i in range(1, values.shape[0]):
+        smoothed = alpha * values[i] + (1 - alpha) * smoothed
+    return smoothed
+
+def calculate_exponential_smoothing_forecast(values, alpha=0.3, periods=12):
     """Calculate forecast using exponential smoothing"""
     try:
-        if len(historical_data) < 2:
+        if len(values) < 2:
             return None
             
-        # Simple exponential smoothing
-        smoothed = [historical_data.iloc[0]]
-        for value in historical_data.iloc[1:]:
-            smoothed.append(alpha * value + (1 - alpha) * smoothed[-1])
+        # Simple exponential smoothing; only the final level is needed
+        last_smoothed = _exponential_smoothing_last(values, alpha)
         
         # Project future values
-        last_smoothed = smoothed[-1]
         return last_smoothed * periods
     except Exception:
         return None
 
-def run_forecast():
-    """Run optimized inventory forecasting analysis with multiple prediction methods"""
+def fetch_monthly_consumption(transactions_collection, since):
+    """Fetch issue quantities per item bucketed by month in a single aggregation
+
+    Returns a dict of item_id -> (months, quantities), with months already as a
+    datetime64[M] array so no date parsing happens per item.
+    """
+    pipeline = [
+        {'$match': {'transaction_type': 'issue', 'transaction_date': {'$gte': since}}},
+        {'$group': {
+            '_id': {
+                'item_id': '$item_id',
+                'month': {'$dateTrunc': {'date': '$transaction_date', 'unit': 'month'}}
+            },
+            'quantity': {'$sum': '$quantity'}
+        }},
+        {'$sort': {'_id.month': 1}}
+    ]
+    
+    rows_by_item = {}
+    for row in transactions_collection.aggregate(pipeline):
+        rows_by_item.setdefault(row['_id']['item_id'], []).append((row['_id']['month'], row['quantity']))
+    
+    monthly_by_item = {}
+    for item_id, rows in rows_by_item.items():
+        months, quantities = zip(*rows)
+        monthly_by_item[item_id] = (np.array(months, dtype='datetime64[M]'),
+                                    np.array(quantities, dtype=np.float64))
+    return monthly_by_item
+
+def _forecast_one(current_stock, min_stock, consumption_data, trend_forecast=None):
+    """Forecast a single item from its (first_month, monthly_values) history
+
+    first_month is the calendar month (1-12) of the first value; monthly_values is a
+    float ndarray of consecutive monthly totals passed straight to the helpers.
+
+    trend_forecast comes precomputed from calculate_trend_forecasts.
+
+    Returns (annual_consumption_rate, projected_annual, monthly_projected, months_to_min,
+    reorder_date, recommended_qty, confidence_level, forecast_method).
+    """
+    
+    # Items without issue history in the window use minimum stock as baseline
+    if consumption_data is None:
+        projected_annual = max(min_stock * 2, 10)  # Default for new items
+        forecast_method = "minimum_baseline"
+        confidence_level = 0.3
+    else:
+        first_month, monthly_consumption = consumption_data
+        
+        # Calculate actual annual consumption
+        annual_consumption = monthly_consumption.sum()
+        
+        # Apply multiple forecasting methods
+        methods = {}
+        
+        # Method 1: Linear trend
+        methods['trend'] = trend_forecast if trend_forecast else None
+        
+        # Method 2: Seasonal pattern
+        seasonal_forecast = calculate_seasonal_forecast(monthly_consumption, first_month)
+        methods['seasonal'] = seasonal_forecast if seasonal_forecast else None
+        
+        # Method 3: Exponential smoothing
+        exp_smooth_forecast = calculate_exponential_smoothing_forecast(monthly_consumption)
+        methods['exponential'] = exp_smooth_forecast if exp_smooth_forecast else None
+        
+        # Method 4: Simple average (fallback)
+        avg_monthly = monthly_consumption.mean()
+        avg_forecast = avg_monthly * 12 * 1.1  # 10% growth buffer
+        methods['average'] = avg_forecast
+        
+        # Select best method based on data quality
+        if len(monthly_consumption) >= 24:
+            # Use weighted combination for longer history; weights are looked up by
+            # method name so a skipped method doesn't shift them onto the others
+            active = {name: (forecast, METHOD_WEIGHTS[name])
+                      for name, forecast in methods.items() if forecast is not None}
+            total_weight = sum(w for _, w in active.values())
+            projected_annual = sum(f * w / total_weight for f, w in active.values())
+            forecast_method = "weighted_combination"
+            confidence_level = 0.85
+        elif len(monthly_consumption) >= 12:
+            # Use seasonal for 1+ year data
+            projected_annual = seasonal_forecast or avg_forecast
+            forecast_method = "seasonal_average"
+            confidence_level = 0.75
+        else:
+            # Use simple average for limited data
+            projected_annual = avg_forecast
+            forecast_method = "simple_average"
+            confidence_level = 0.6
+
+    # Calculate consumption rate
+    if current_stock > 0:
+        annual_consumption_rate = projected_annual / max(current_stock, 1)
+    else:
+        annual_consumption_rate = 0
+    
+    # Monthly projected consumption
+    monthly_projected = projected_annual / 12
+    
+    # Calculate months until minimum stock
+    if monthly_projected > 0:
+        months_to_min = max((current_stock - min_stock) / monthly_projected, 0)
+    else:
+        months_to_min = 999
+    
+    # Calculate reorder date with buffer
+    if months_to_min <= 12:
+        # Add safety buffer based on confidence level
+        buffer_days = max(7, int((1 - confidence_level) * 30))
+        reorder_date = datetime.now() + timedelta(days=int(months_to_min * 30) + buffer_days)
+    else:
+        reorder_date = None
+    
+    # Calculate recommended order quantity with optimization
+    if months_to_min <= 6:  # Extended reorder window
+        # Base calculation
+        base_qty = int(projected_annual * (6 - months_to_min) / 12)
+        
+        # Adjust based on current stock vs min stock
+        stock_adjustment = max(min_stock - current_stock, 0)
+        
+        # Economic order quantity consideration
+        if monthly_projected > 0:
+            optimal_qty = max(base_qty, stock_adjustment, _EOQ)
+        else:
+            optimal_qty = max(base_qty, stock_adjustment)
+        
+        recommended_qty = max(optimal_qty, min_stock)
+    else:
+        recommended_qty = 0
+    
+    # Ensure recommended quantity is reasonable
+    if recommended_qty > 0:
+        recommended_qty = max(recommended_qty, min_stock)
+        if current_stock > 0:
+            recommended_qty = min(recommended_qty, current_stock * 3)  # Cap at 3x current stock
+    
+    return (annual_consumption_rate, projected_annual, monthly_projected, months_to_min,
+            reorder_date, recommended_qty, confidence_level, forecast_method)
+
+def run_forecast(db=None):
+    """Run optimized inventory forecasting analysis with multiple prediction methods
+
+    Pass ``db`` to reuse an existing database handle; otherwise the shared
+    MongoDBConnection client is used. The client is left open so repeated runs
+    in the same process skip the TLS handshake and server discovery.
+    """
     
     # Create directories for output
     static_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static')
@@ -91,32 +285,19 @@ def run_forecast():
     os.makedirs(static_dir, exist_ok=True)
     os.makedirs(reports_dir, exist_ok=True)
     
-    # Get database connection
-    db = MongoDBConnection()
+    # Get database connection (pooled client shared across runs)
+    if db is None:
+        db = MongoDBConnection.get_database()
     
     try:
         # Get all items with transaction history
         items_collection = db['items']
         transactions_collection = db['inventory_transactions']
         
-        # Get all items
-        items_data = list(items_collection.find({}))
-        
-        # Count transactions for each item
-        for item in items_data:
-            transaction_count = transactions_collection.count_documents({
-                'item_id': item['_id'],
-                'transaction_type': 'issue'
-            })
-            item['transaction_count'] = transaction_count
+        # Get all items, projecting only the fields the forecast uses
+        items_data = list(items_collection.find({}, projection=ITEM_FIELDS))
         
-        items_df = pd.DataFrame(items_data)
-        
-        if items_df.empty:
-            print("No items found in database")
-            return
-        
-        if items_df.empty:
+        if not items_data:
             print("No items found in database")
             return
         
@@ -126,177 +307,79 @@ def run_forecast():
         # Clear old forecast data
         forecast_collection.delete_many({})
         
-        # Process each item with optimized forecasting
-        forecast_results = []
-        processed_count = 0
+        # Fetch two years of consumption history for all items at once
+        two_years_ago = datetime.now() - timedelta(days=730)
+        consumption_by_item = fetch_monthly_consumption(transactions_collection, two_years_ago)
         
-        for _, item in items_df.iterrows():
-            item_id = item['id']
-            item_name = item['name']
-            current_stock = item['current_stock']
-            min_stock = item['min_stock']
-            unit = item['unit']
-            transaction_count = item['transaction_count']
-            
-            # Skip items with no transaction history
-            if transaction_count == 0:
-                # Use minimum stock as baseline for new items
-                projected_annual = max(min_stock * 2, 10)  # Default for new items
-                forecast_method = "minimum_baseline"
-                confidence_level = 0.3
-            else:
-                # Get detailed consumption history
-                two_years_ago = datetime.now() - timedelta(days=730)
-                
-                # Get consumption data from MongoDB
-                consumption_data = list(transactions_collection.find({
-                    'item_id': item_id,
-                    'transaction_type': 'issue',
-                    'transaction_date': {'$gte': two_years_ago}
-                }, {'transaction_date': 1, 'quantity': 1}).sort('transaction_date', 1))
-                
-                consumption_data = pd.DataFrame(consumption_data)
-                
-                if consumption_data.empty:
-                    projected_annual = max(min_stock * 2, 10)
-                    forecast_method = "minimum_baseline"
-                    confidence_level = 0.3
-                else:
-                    # Create monthly consumption series
-                    consumption_data['transaction_date'] = pd.to_datetime(consumption_data['transaction_date'])
-                    monthly_consumption = consumption_data.groupby(
-                        pd.Grouper(key='transaction_date', freq='M')
-                    )['quantity'].sum().fillna(0)
-                    
-                    # Calculate actual annual consumption
-                    annual_consumption = monthly_consumption.sum()
-                    
-                    # Apply multiple forecasting methods
-                    methods = []
-                    
-                    # Method 1: Linear trend
-                    trend_forecast = calculate_trend_forecast(monthly_consumption)
-                    if trend_forecast:
-                        methods.append(('trend', trend_forecast))
-                    
-                    # Method 2: Seasonal pattern
-                    seasonal_forecast = calculate_seasonal_forecast(monthly_consumption)
-                    if seasonal_forecast:
-                        methods.append(('seasonal', seasonal_forecast))
-                    
-                    # Method 3: Exponential smoothing
-                    exp_smooth_forecast = calculate_exponential_smoothing_forecast(monthly_consumption)
-                    if exp_smooth_forecast:
-                        methods.append(('exponential', exp_smooth_forecast))
-                    
-                    # Method 4: Simple average (fallback)
-                    avg_monthly = monthly_consumption.mean()
-                    avg_forecast = avg_monthly * 12 * 1.1  # 10% growth buffer
-                    methods.append(('average', avg_forecast))
-                    
-                    # Select best method based on data quality
-                    if len(monthly_consumption) >= 24:
-                        # Use weighted combination for longer history
-                        weights = [0.4, 0.3, 0.2, 0.1]  # Trend gets highest weight
-                        weighted_forecast = sum(w * f for (_, f), w in zip(methods, weights))
-                        projected_annual = weighted_forecast
-                        forecast_method = "weighted_combination"
-                        confidence_level = 0.85
-                    elif len(monthly_consumption) >= 12:
-                        # Use seasonal for 1+ year data
-                        projected_annual = seasonal_forecast or avg_forecast
-                        forecast_method = "seasonal_average"
-                        confidence_level = 0.75
-                    else:
-                        # Use simple average for limited data
-                        projected_annual = avg_forecast
-                        forecast_method = "simple_average"
-                        confidence_level = 0.6
-            
-            # Calculate consumption rate
-            if current_stock > 0:
-                annual_consumption_rate = projected_annual / max(current_stock, 1)
-            else:
-                annual_consumption_rate = 0
-            
-            # Monthly projected consumption
-            monthly_projected = projected_annual / 12
-            
-            # Calculate months until minimum stock
-            if monthly_projected > 0:
-                months_to_min = max((current_stock - min_stock) / monthly_projected, 0)
-            else:
-                months_to_min = 999
-            
-            # Calculate reorder date with buffer
-            if months_to_min <= 12:
-                # Add safety buffer based on confidence level
-                buffer_days = max(7, int((1 - confidence_level) * 30))
-                reorder_date = datetime.now() + timedelta(days=int(months_to_min * 30) + buffer_days)
-            else:
-                reorder_date = None
-            
-            # Calculate recommended order quantity with optimization
-            if months_to_min <= 6:  # Extended reorder window
-                # Base calculation
-                base_qty = int(projected_annual * (6 - months_to_min) / 12)
-                
-                # Adjust based on current stock vs min stock
-                stock_adjustment = max(min_stock - current_stock, 0)
-                
-                # Economic order quantity consideration
-                if monthly_projected > 0:
-                    # EOQ = sqrt(2 * D * S / H) where D=demand, S=ordering cost, H=holding cost
-                    # Simplified EOQ with estimated values
-                    eoq = int(np.sqrt(2 * projected_annual * 50 / (projected_annual * 0.2)))
-                    optimal_qty = max(base_qty, stock_adjustment, eoq)
-                else:
-                    optimal_qty = max(base_qty, stock_adjustment)
-                
-                recommended_qty = max(optimal_qty, min_stock)
-            else:
-                recommended_qty = 0
-            
-            # Ensure recommended quantity is reasonable
-            if recommended_qty > 0:
-                recommended_qty = max(recommended_qty, min_stock)
-                if current_stock > 0:
-                    recommended_qty = min(recommended_qty, current_stock * 3)  # Cap at 3x current stock
-            
-            # Store result with enhanced metadata
-            forecast_result = {
-                'item_id': item_id,
-                'item_name': item_name,
-                'category': item['category'],
-                'current_stock': current_stock,
-                'min_stock': min_stock,
-                'unit': unit,
-                'annual_consumption_rate': annual_consumption_rate,
-                'projected_annual_consumption': projected_annual,
-                'monthly_projected_consumption': monthly_projected,
-                'months_to_min_stock': months_to_min,
-                'reorder_date': reorder_date,
-                'recommended_order_qty': recommended_qty,
-                'confidence_level': confidence_level,
-                'forecast_method': forecast_method,
-                'forecast_date': datetime.now()
-            }
-            
-            forecast_results.append(forecast_result)
-            
-            processed_count += 1
-            
-            # Progress indicator
-            if processed_count % 10 == 0:
-                print(f"Processed {processed_count} items...")
+        # Densify each history to consecutive months; bincount over month offsets
+        # fills months without issues with 0 (rows arrive sorted by month). The
+        # first month is kept as its calendar month (1-12) for the seasonal method
+        monthly_by_item = {
+            item_id: (int(months[0].astype(np.int64) % 12) + 1,
+                      np.bincount((months - months[0]).astype(np.int64), weights=quantities))
+            for item_id, (months, quantities) in consumption_by_item.items()
+        }
         
-        # Insert all forecast results into MongoDB
-        if forecast_results:
-            forecast_collection.insert_many(forecast_results)
-            print(f"Successfully inserted {len(forecast_results)} forecast records")
+        # Trend forecasts for all items in a few batched least-squares solves
+        trend_by_item = calculate_trend_forecasts(
+            {item_id: values for item_id, (_, values) in monthly_by_item.items()}
+        )
         
-        # Create DataFrame for analysis
-        forecast_df = pd.DataFrame(forecast_results)
+        # Hoist columns out of the loop straight from the raw documents
+        ids = [item.get('id') for item in items_data]
+        names = [item.get('name') for item in items_data]
+        categories = [item.get('category') for item in items_data]
+        stocks = [item.get('current_stock') for item in items_data]
+        min_stocks = [item.get('min_stock') for item in items_data]
+        units = [item.get('unit') for item in items_data]
+        
+        # Items are independent, so forecast them in parallel once the catalog is large
+        # enough to amortize worker start-up; workers only receive plain values and arrays
+        n_items = len(ids)
+        n_jobs = -1 if n_items >= PARALLEL_MIN_ITEMS else 1
+        forecast_results = Parallel(n_jobs=n_jobs)(
+            delayed(_forecast_one)(stocks[i], min_stocks[i], monthly_by_item.get(ids[i]),
+                                   trend_by_item.get(ids[i]))
+            for i in range(n_items)
+        )
+        print(f"Processed {n_items} items...")
+        
+        # Collect results column-wise so the summary below works on contiguous arrays
+        consumption_rates = np.empty(n_items)
+        projected = np.empty(n_items)
+        monthly_projected = np.empty(n_items)
+        months_to_min = np.empty(n_items)
+        reorder_dates = np.empty(n_items, dtype=object)
+        recommended_qty = np.empty(n_items)
+        confidence = np.empty(n_items)
+        forecast_methods = np.empty(n_items, dtype=object)
+        for i, result in enumerate(forecast_results):
+            (consumption_rates[i], projected[i], monthly_projected[i], months_to_min[i],
+             reorder_dates[i], recommended_qty[i], confidence[i], forecast_methods[i]) = result
+        
+        forecast_df = pd.DataFrame({
+            'item_id': ids,
+            'item_name': names,
+            'category': categories,
+            'current_stock': stocks,
+            'min_stock': min_stocks,
+            'unit': units,
+            'annual_consumption_rate': consumption_rates,
+            'projected_annual_consumption': projected,
+            'monthly_projected_consumption': monthly_projected,
+            'months_to_min_stock': months_to_min,
+            # dtype=object keeps None instead of inferring datetime64 with NaT (not BSON-encodable)
+            'reorder_date': pd.Series(reorder_dates, dtype=object),
+            'recommended_order_qty': recommended_qty,
+            'confidence_level': confidence,
+            'forecast_method': forecast_methods,
+            'forecast_date': pd.Series([datetime.now()] * n_items, dtype=object)
+        })
+        
+        # Insert all forecast results into MongoDB
+        if not forecast_df.empty:
+            forecast_collection.insert_many(forecast_df.to_dict('records'), ordered=False)
+            print(f"Successfully inserted {len(forecast_df)} forecast records")
         
         if not forecast_df.empty:
             # Generate comprehensive summary
@@ -330,16 +413,16 @@ def run_forecast():
             for method, count in method_counts.items():
                 print(f"   • {method.replace('_', ' ').title()}: {count} items")
             
-            # Export detailed results
+            # Export detailed results with xlsxwriter (faster than openpyxl). constant_memory
+            # is not usable here: pandas writes cells column by column, and that mode drops
+            # writes to rows it has already flushed
+            excel_options = {'engine': 'xlsxwriter'}
             forecast_df.to_excel(os.path.join(reports_dir, 'inventory_forecast_detailed.xlsx'), 
-                               index=False)
+                               index=False, **excel_options)
             
-            # Create simplified summary
-            summary_df = forecast_df[['item_name', 'category', 'current_stock', 'min_stock', 
-                                    'months_to_min_stock', 'recommended_order_qty', 
-                                    'confidence_level', 'forecast_method']]
-            summary_df.to_excel(os.path.join(reports_dir, 'inventory_forecast_summary.xlsx'), 
-                              index=False)
+            # Create simplified summary (selected columns, no intermediate copy)
+            forecast_df.to_excel(os.path.join(reports_dir, 'inventory_forecast_summary.xlsx'), 
+                               index=False, columns=SUMMARY_COLUMNS, **excel_options)
             
             print(f"\n✅ Forecasting completed successfully!")
             print(f"   Detailed report: {os.path.join(reports_dir, 'inventory_forecast_detailed.xlsx')}")
@@ -350,10 +433,10 @@ def run_forecast():
             
     except Exception as e:
         print(f"❌ Error during forecasting: {str(e)}")
-        conn.rollback()
         raise
-    finally:
-        conn.close()
 
 if __name__ == "__main__":
-    run_forecast()
\ No newline at end of file
+    try:
+        run_forecast()
+    finally:
+        MongoDBConnection.close_connection()
\ No newline at end of file
@@ -12,6 +12,10 @@ os.makedirs(data_dir, exist_ok=True)
 # Connect to the database using relative path
 db_path = os.path.join(data_dir, 'inventory.db')
 conn = sqlite3.connect(db_path)
+# Bulk load: keep the journal in memory and skip fsyncs, the data is regenerable
+conn.execute("PRAGMA journal_mode=MEMORY")
+conn.execute("PRAGMA synchronous=OFF")
+conn.execute("PRAGMA temp_store=MEMORY")
 cursor = conn.cursor()
 
 # Define healthcare consumable items
@@ -136,90 +140,75 @@ if not cursor.fetchone():
     ''')
 
 # Generate transaction history for the past year
-start_date = datetime.now() - timedelta(days=365)
+start_date = (datetime.now() - timedelta(days=365)).replace(hour=0, minute=0, second=0, microsecond=0)
 end_date = datetime.now()
+rng = np.random.default_rng()
 
-# Get item IDs
-cursor.execute("SELECT id FROM items")
-item_ids = [row[0] for row in cursor.fetchall()]
+# Get item details once instead of querying per transaction
+cursor.execute("SELECT id, current_stock, name FROM items")
+item_rows = cursor.fetchall()
+item_ids = np.array([row[0] for row in item_rows])
+item_stocks = np.array([row[1] for row in item_rows], dtype=float)
+item_names = [row[2] for row in item_rows]
 
 # Get department IDs
 cursor.execute("SELECT id FROM departments")
 dept_ids = [row[0] for row in cursor.fetchall()]
+to_dept_ids = np.array([dept for dept in dept_ids if dept != 1])
+
+# Number of transactions per day (random between 5-15)
+num_days = (end_date - start_date).days + 1
+day_offsets = np.repeat(np.arange(num_days), rng.integers(5, 16, num_days))
+num_transactions = len(day_offsets)
+
+item_idx = rng.integers(0, len(item_ids), num_transactions)
+stocks = item_stocks[item_idx]
+
+# Determine transaction type (80% issues, 20% receives)
+is_issue = rng.random(num_transactions) < 0.8
+
+# Issue 1-5% of current stock, receive 10-30% of current stock (at least 1)
+quantities = np.where(
+    is_issue,
+    stocks * rng.uniform(0.01, 0.05, num_transactions),
+    stocks * rng.uniform(0.1, 0.3, num_transactions)
+).astype(int).clip(min=1)
+to_depts = np.where(is_issue, rng.choice(to_dept_ids, num_transactions), 1)  # Management (updated from Farmasi)
+
+# Transaction time between 08:00 and 17:59 on each day
+minute_offsets = day_offsets * 1440 + rng.integers(8 * 60, 18 * 60, num_transactions)
+transaction_dates = (pd.Timestamp(start_date) + pd.to_timedelta(minute_offsets, unit='m')).strftime("%Y-%m-%d %H:%M:%S")
+
+transactions = [
+    (
+        item_id,
+        transaction_date,
+        quantity,
+        "issue" if issue else "receive",
+        1 if issue else None,
+        to_dept,
+        1,  # Assuming user ID 1 exists
+        f"Distribusi rutin {item_names[idx]}" if issue else f"Penerimaan stok {item_names[idx]}"
+    )
+    for idx, item_id, transaction_date, quantity, issue, to_dept in zip(
+        item_idx.tolist(), item_ids[item_idx].tolist(), transaction_dates,
+        quantities.tolist(), is_issue.tolist(), to_depts.tolist()
+    )
+]
 
-# Generate transactions
-transactions = []
-current_date = start_date
-
-while current_date <= end_date:
-    # Number of transactions for this day (random between 5-15)
-    num_transactions = random.randint(5, 15)
-    
-    for _ in range(num_transactions):
-        item_id = random.choice(item_ids)
-        
-        # Get item details
-        cursor.execute("SELECT current_stock, name FROM items WHERE id = ?", (item_id,))
-        item_stock, item_name = cursor.fetchone()
-        
-        # Determine transaction type (80% issues, 20% receives)
-        transaction_type = "issue" if random.random() < 0.8 else "receive"
-        
-        if transaction_type == "issue":
-            # Issue quantity between 1% and 5% of current stock
-            quantity = int(item_stock * random.uniform(0.01, 0.05))
-            from_dept = 1  # Management (updated from Farmasi)
-            to_dept = random.choice([dept for dept in dept_ids if dept != 1])
-            notes = f"Distribusi rutin {item_name}"
-        else:
-            # Receive quantity between 10% and 30% of current stock
-            quantity = int(item_stock * random.uniform(0.1, 0.3))
-            from_dept = None
-            to_dept = 1  # Management (updated from Farmasi)
-            notes = f"Penerimaan stok {item_name}"
-        
-        # Ensure quantity is at least 1
-        quantity = max(1, quantity)
-        
-        # Add transaction
-        transaction_date = current_date + timedelta(hours=random.randint(8, 17), minutes=random.randint(0, 59))
-        
-        transactions.append({
-            "item_id": item_id,
-            "transaction_date": transaction_date.strftime("%Y-%m-%d %H:%M:%S"),
-            "quantity": quantity,
-            "transaction_type": transaction_type,
-            "from_department_id": from_dept,
-            "to_department_id": to_dept,
-            "created_by": 1,  # Assuming user ID 1 exists
-            "notes": notes
-        })
-    
-    # Move to next day
-    current_date += timedelta(days=1)
-
-# Insert transactions
-for transaction in transactions:
-    cursor.execute(
+# Insert transactions; the connection context commits everything written
+# since the first INSERT above as a single transaction
+with conn:
+    cursor.executemany(
         """
         INSERT INTO inventory_transactions 
         (item_id, transaction_date, quantity, transaction_type, from_department_id, to_department_id, created_by, notes)
         VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         """,
-        (
-            transaction["item_id"], 
-            transaction["transaction_date"], 
-            transaction["quantity"], 
-            transaction["transaction_type"],
-            transaction["from_department_id"], 
-            transaction["to_department_id"], 
-            transaction["created_by"],
-            transaction["notes"]
-        )
+        transactions
     )
 
-# Commit changes and close connection
-conn.commit()
+# Close connection
 conn.close()
 
 print("Dummy data has been successfully generated and inserted into the database.")
\ No newline at end of file
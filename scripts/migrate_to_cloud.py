@@ -7,82 +7,248 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from pymongo import MongoClient
+from pymongo import MongoClient, IndexModel
+from pymongo.write_concern import WriteConcern
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
 from utils.database import MongoDBConnection
 from config import MONGODB_SETTINGS
+from scripts._mongo_uri import build_uri_from_settings, _analyze_settings
+import json
 import logging
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+LOCAL_MONGODB_URI = "mongodb://localhost:27017"
+
+# Daftar koleksi yang akan dimigrasi
+MIGRATION_COLLECTIONS = frozenset({
+    'users', 'items', 'warehouses', 'farmers', 'merchants', 
+    'harvests', 'seeds', 'fertilizers', 'distribution_routes', 
+    'inventory_transactions', 'item_requests', 'notifications'
+})
+
+# Pakai mongodump | mongorestore bila tersedia (set MIGRATION_USE_TOOLS=0 untuk mematikan)
+MIGRATION_USE_TOOLS = os.getenv('MIGRATION_USE_TOOLS', '1') != '0'
+
+# Jumlah dokumen per batch baca (cursor) dan tulis (insert_many)
+MIGRATION_BATCH_SIZE = 1000
+
+# Migrasi bersifat sekali jalan dan bisa diulang dari sumber lokal, jadi cukup
+# acknowledgment dari primary (w=1, tanpa menunggu journal) alih-alih majority
+MIGRATION_WRITE_CONCERN = WriteConcern(w=1, j=False)
+
+# Dokumen sumber dibaca sebagai BSON mentah dan dikirim ulang apa adanya,
+# tanpa decode ke dict lalu encode lagi saat insert
+RAW_BSON_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+# Jumlah koleksi yang dimigrasi bersamaan; pool koneksi dibuat lebih besar
+# agar worker tidak saling menunggu koneksi
+MIGRATION_WORKERS = 6
+MIGRATION_POOL_SIZE = 20
+
+# Koleksi besar dibagi per rentang _id dan tiap rentang disalin paralel
+PARTITION_MIN_DOCUMENTS = 100000
+MIGRATION_PARTITIONS = 8
+
+def _iter_batches(cursor, batch_size=MIGRATION_BATCH_SIZE):
+    """Kelompokkan dokumen dari cursor menjadi list berukuran batch_size"""
+    buffer = []
+    for document in cursor:
+        buffer.append(document)
+        if len(buffer) >= batch_size:
+            yield buffer
+            buffer = []
+    if buffer:
+        yield buffer
+
+def _cloud_uri():
+    """Connection string tujuan untuk mongorestore dari MONGODB_SETTINGS; return (uri, versi tersamar)"""
+    return build_uri_from_settings(MONGODB_SETTINGS, _analyze_settings().is_cloud)
+
+def _non_empty_collections(local_db, collections):
+    """Nama koleksi yang ada di lokal dan berisi minimal satu dokumen"""
+    local_names = set(local_db.list_collection_names())
+    return sorted(
+        name for name in collections
+        if name in local_names and local_db[name].find_one({}, {'_id': 1}) is not None
+    )
+
+def migrate_with_tools(local_db, collections):
+    """Salin koleksi lokal ke Atlas lewat pipe mongodump | mongorestore
+
+    Dokumen dialirkan sebagai arsip BSON antar tools tanpa decode/encode di Python.
+    Koleksi cloud di-drop lalu dipulihkan beserta index dari sumber lokal; koleksi
+    yang kosong di lokal tidak ikut di-restore sehingga data cloud-nya tidak terhapus
+    (sama seperti jalur PyMongo). Return True jika kedua proses selesai sukses.
+    """
+    if not (shutil.which('mongodump') and shutil.which('mongorestore')):
+        return False
+    
+    collections = _non_empty_collections(local_db, collections)
+    if not collections:
+        logger.info("Tidak ada koleksi lokal yang berisi data, tidak ada yang dimigrasi")
+        return True
+    
+    database = MONGODB_SETTINGS['database']
+    cloud_uri, masked_uri = _cloud_uri()
+    
+    dump_cmd = ['mongodump', '--uri', LOCAL_MONGODB_URI, '--db', database, '--archive', '--gzip']
+    for collection_name in sorted(MIGRATION_COLLECTIONS - set(collections)):
+        dump_cmd += ['--excludeCollection', collection_name]
+    
+    # URI Atlas berisi password: dikirim lewat file --config (mode 0600 dari mkstemp),
+    # bukan argv yang bisa dibaca siapa pun lewat `ps`
+    config_fd, config_path = tempfile.mkstemp(suffix='.yaml')
+    try:
+        with os.fdopen(config_fd, 'w') as config_file:
+            config_file.write(f"uri: {json.dumps(cloud_uri)}\n")
+        
+        restore_cmd = ['mongorestore', f'--config={config_path}', '--archive', '--gzip', '--drop',
+                       '--numInsertionWorkersPerCollection=8']
+        for collection_name in collections:
+            restore_cmd += ['--nsInclude', f"{database}.{collection_name}"]
+        
+        logger.info(f"Migrasi via mongodump | mongorestore ke {masked_uri}")
+        with subprocess.Popen(dump_cmd, stdout=subprocess.PIPE) as dump:
+            restore = subprocess.Popen(restore_cmd, stdin=dump.stdout)
+            dump.stdout.close()  # mongodump dapat SIGPIPE jika mongorestore berhenti duluan
+            restore_rc = restore.wait()
+        if dump.returncode != 0 or restore_rc != 0:
+            logger.warning(f"mongodump/mongorestore gagal (exit {dump.returncode}/{restore_rc})")
+            return False
+        return True
+    except OSError as e:
+        logger.warning(f"Gagal menjalankan mongodump/mongorestore: {e}")
+        return False
+    finally:
+        os.unlink(config_path)
+
+def _partition_ids(collection, n):
+    """Bagi koleksi menjadi n rentang _id memakai $bucketAuto; mengembalikan list filter query"""
+    buckets = collection.aggregate([{'$bucketAuto': {'groupBy': '$_id', 'buckets': n}}])
+    bounds = [bucket['_id']['min'] for bucket in buckets]
+    
+    # Rentang [lo, hi) berurutan; rentang terakhir terbuka ke atas
+    queries = [{'_id': {'$gte': lo, '$lt': hi}} for lo, hi in zip(bounds, bounds[1:])]
+    queries.append({'_id': {'$gte': bounds[-1]}})
+    return queries
+
+def _copy_range(local_collection, cloud_collection, query):
+    """Stream dokumen yang cocok dengan query ke cloud per batch; mengembalikan jumlah dokumen"""
+    cursor = local_collection.find(query, no_cursor_timeout=True).batch_size(MIGRATION_BATCH_SIZE)
+    copied = 0
+    try:
+        for batch in _iter_batches(cursor):
+            # Insert data ke cloud; unordered agar server bisa memproses batch paralel
+            cloud_collection.insert_many(batch, ordered=False, bypass_document_validation=True)
+            copied += len(batch)
+    finally:
+        cursor.close()
+    return copied
+
+def _index_model(index_spec):
+    """Bangun ulang IndexModel dari dokumen hasil list_indexes()"""
+    options = {k: v for k, v in index_spec.items() if k not in ('key', 'v', 'ns')}
+    return IndexModel(list(index_spec['key'].items()), **options)
+
+def _migrate_one(local_db, cloud_db, collection_name, local_names):
+    """Migrasi satu koleksi; mengembalikan jumlah dokumen yang dimigrasi
+
+    local_names adalah set nama koleksi lokal yang diambil sekali oleh pemanggil.
+    """
+    try:
+        logger.info(f"Migrasi koleksi: {collection_name}")
+        
+        # Cek apakah koleksi ada di lokal
+        if collection_name not in local_names:
+            logger.warning(f"Koleksi {collection_name} tidak ditemukan di lokal, dilewati")
+            return 0
+        
+        local_collection = local_db.get_collection(collection_name, codec_options=RAW_BSON_OPTIONS)
+        cloud_collection = cloud_db.get_collection(collection_name, write_concern=MIGRATION_WRITE_CONCERN)
+        
+        # Koleksi kosong dilewati tanpa menghapus data di cloud
+        if local_collection.find_one({}, {'_id': 1}) is None:
+            logger.info(f"Koleksi {collection_name} kosong, dilewati")
+            return 0
+        
+        # Simpan definisi index sekunder, lalu drop koleksi cloud: jauh lebih murah
+        # daripada delete_many per dokumen, dan bulk load berjalan tanpa index
+        # sekunder; index dibangun ulang sekali setelah data masuk
+        saved_indexes = [index for index in cloud_collection.list_indexes() if index['name'] != '_id_']
+        cloud_db.drop_collection(collection_name)
+        
+        try:
+            # Stream data dari koleksi lokal per batch agar memori tetap O(batch);
+            # koleksi besar disalin per rentang _id secara paralel
+            if local_collection.estimated_document_count() >= PARTITION_MIN_DOCUMENTS:
+                queries = _partition_ids(local_collection, MIGRATION_PARTITIONS)
+                with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+                    migrated_count = sum(executor.map(
+                        lambda query: _copy_range(local_collection, cloud_collection, query), queries
+                    ))
+            else:
+                migrated_count = _copy_range(local_collection, cloud_collection, {})
+        finally:
+            if saved_indexes:
+                cloud_collection.create_indexes([_index_model(index) for index in saved_indexes])
+        
+        logger.info(f"Berhasil migrasi {migrated_count} dokumen dari {collection_name}")
+        return migrated_count
+        
+    except Exception as e:
+        logger.error(f"Gagal migrasi koleksi {collection_name}: {e}")
+        return 0
+
 def migrate_to_cloud():
     """Migrasi data dari MongoDB lokal ke MongoDB Atlas"""
     
     # Koneksi ke MongoDB lokal (sumber)
     try:
-        local_client = MongoClient("mongodb://localhost:27017")
+        local_client = MongoClient(LOCAL_MONGODB_URI, maxPoolSize=MIGRATION_POOL_SIZE)
         local_db = local_client[MONGODB_SETTINGS['database']]
         logger.info("Terhubung ke MongoDB lokal")
     except Exception as e:
         logger.error(f"Gagal koneksi ke MongoDB lokal: {e}")
         return False
     
-    # Koneksi ke MongoDB Atlas (tujuan)
+    # Koneksi ke MongoDB Atlas (tujuan) lewat client singleton MongoDBConnection, yang
+    # juga dipakai verifikasi; opsi koneksi (pool, kompresi wire protocol) diatur di sana
     try:
         cloud_client = MongoDBConnection.get_client()
+        cloud_client.admin.command('ping')
         cloud_db = MongoDBConnection.get_database()
         logger.info("Terhubung ke MongoDB Atlas")
     except Exception as e:
         logger.error(f"Gagal koneksi ke MongoDB Atlas: {e}")
         return False
     
-    # Daftar koleksi yang akan dimigrasi
-    collections_to_migrate = [
-        'users', 'items', 'warehouses', 'farmers', 'merchants', 
-        'harvests', 'seeds', 'fertilizers', 'distribution_routes', 
-        'inventory_transactions', 'item_requests', 'notifications'
-    ]
-    
-    total_migrated = 0
-    
-    for collection_name in collections_to_migrate:
-        try:
-            logger.info(f"Migrasi koleksi: {collection_name}")
-            
-            # Cek apakah koleksi ada di lokal
-            if collection_name not in local_db.list_collection_names():
-                logger.warning(f"Koleksi {collection_name} tidak ditemukan di lokal, dilewati")
-                continue
-            
-            # Ambil semua data dari koleksi lokal
-            local_collection = local_db[collection_name]
-            documents = list(local_collection.find())
-            
-            if not documents:
-                logger.info(f"Koleksi {collection_name} kosong, dilewati")
-                continue
-            
-            # Hapus data existing di cloud
-            cloud_collection = cloud_db[collection_name]
-            cloud_collection.delete_many({})
-            
-            # Insert data ke cloud
-            if documents:
-                cloud_collection.insert_many(documents)
-                migrated_count = len(documents)
-                total_migrated += migrated_count
-                logger.info(f"Berhasil migrasi {migrated_count} dokumen dari {collection_name}")
-            
-        except Exception as e:
-            logger.error(f"Gagal migrasi koleksi {collection_name}: {e}")
-            continue
+    # Jalur cepat: data tidak melewati proses Python sama sekali
+    if MIGRATION_USE_TOOLS and migrate_with_tools(local_db, MIGRATION_COLLECTIONS):
+        logger.info("Migrasi selesai via mongodump | mongorestore")
+    else:
+        # Satu round trip untuk daftar koleksi lokal, bukan satu per koleksi
+        local_names = set(local_db.list_collection_names())
+        
+        # Koleksi saling independen; PyMongo melepas GIL saat I/O jaringan sehingga
+        # baca lokal dan tulis cloud antar koleksi bisa berjalan bersamaan
+        with ThreadPoolExecutor(max_workers=MIGRATION_WORKERS) as executor:
+            migrated_counts = list(executor.map(
+                lambda name: _migrate_one(local_db, cloud_db, name, local_names), MIGRATION_COLLECTIONS
+            ))
+        total_migrated = sum(migrated_counts)
+        logger.info(f"Migrasi selesai! Total {total_migrated} dokumen dimigrasi")
     
-    # Tutup koneksi
+    # Tutup koneksi lokal; client cloud (singleton) tetap hidup untuk verifikasi
     local_client.close()
-    MongoDBConnection.close_connection()
     
-    logger.info(f"Migrasi selesai! Total {total_migrated} dokumen dimigrasi")
     return True
 
 def verify_migration():
@@ -92,7 +258,8 @@ def verify_migration():
         
         logger.info("Verifikasi migrasi:")
         for collection_name in cloud_db.list_collection_names():
-            count = cloud_db[collection_name].count_documents({})
+            # Hitungan dari metadata koleksi, tanpa scan seluruh dokumen
+            count = cloud_db[collection_name].estimated_document_count()
             logger.info(f"- {collection_name}: {count} dokumen")
         
         return True
@@ -108,11 +275,14 @@ if __name__ == "__main__":
     
     confirm = input("Apakah Anda ingin melanjutkan migrasi? (y/N): ")
     if confirm.lower() == 'y':
-        if migrate_to_cloud():
-            print("\n=== VERIFIKASI MIGRASI ===")
-            verify_migration()
-            print("\nMigrasi selesai!")
-        else:
-            print("Migrasi gagal!")
+        try:
+            if migrate_to_cloud():
+                print("\n=== VERIFIKASI MIGRASI ===")
+                verify_migration()
+                print("\nMigrasi selesai!")
+            else:
+                print("Migrasi gagal!")
+        finally:
+            MongoDBConnection.close_connection()
     else:
         print("Migrasi dibatalkan")
@@ -4,17 +4,58 @@ Script untuk setup environment yang aman
 """
 
 import os
+import re
 import sys
 import shutil
+import subprocess
 from pathlib import Path
 
+# Try to import pygit2 to read the git index without spawning a git process
+try:
+    import pygit2
+    PYGIT2_AVAILABLE = True
+except ImportError:
+    PYGIT2_AVAILABLE = False
+
+# Baris .env (bukan komentar) yang nama variabelnya mengandung kata sensitif;
+# group(2) adalah nilainya
+SENSITIVE_RE = re.compile(r'(?i)^[^#=\n]*(password|secret|key|token|auth)[^=\n]*=(.*)$', re.MULTILINE)
+PLACEHOLDER_VALUES = ('', 'your_password_here', 'your-secret-key-here')
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+def _env_tracked_in_git(project_root):
+    """Cek apakah .env ter-track/staged di git; return None jika bukan repository git
+
+    Dengan pygit2 index dibaca langsung; tanpa pygit2 fallback ke `git ls-files`,
+    keduanya memeriksa keanggotaan .env di index.
+    """
+    if PYGIT2_AVAILABLE:
+        repo_path = pygit2.discover_repository(str(project_root))
+        if repo_path is None:
+            return None
+        repo = pygit2.Repository(repo_path)
+        if repo.workdir is None:
+            return None
+        env_path = Path(os.path.relpath(project_root / ".env", repo.workdir)).as_posix()
+        return env_path in repo.index
+    
+    # Exit 0: .env ada di index; 1: tidak ada; lainnya (128): bukan repository git
+    result = subprocess.run(['git', 'ls-files', '--error-unmatch', '.env'], 
+                          cwd=project_root, 
+                          capture_output=True, 
+                          text=True)
+    if result.returncode not in (0, 1):
+        return None
+    return result.returncode == 0
+
 def setup_secure_environment():
     """Setup environment yang aman untuk development"""
     
     print("🔒 SETUP ENVIRONMENT YANG AMAN")
     print("=" * 50)
     
-    project_root = Path(__file__).parent.parent
+    project_root = PROJECT_ROOT
     env_file = project_root / ".env"
     env_example = project_root / ".env.example"
     gitignore_file = project_root / ".gitignore"
@@ -34,16 +75,14 @@ def setup_secure_environment():
     
     # 3. Verify .gitignore exists dan contains .env
     if gitignore_file.exists():
-        with open(gitignore_file, 'r') as f:
-            gitignore_content = f.read()
-        
-        if '.env' in gitignore_content:
-            print("✅ .env sudah ada di .gitignore")
-        else:
-            print("⚠️  Menambahkan .env ke .gitignore...")
-            with open(gitignore_file, 'a') as f:
+        # Satu kali open: baca isi, lalu tulis di posisi akhir file jika perlu
+        with open(gitignore_file, 'r+') as f:
+            if '.env' in f.read():
+                print("✅ .env sudah ada di .gitignore")
+            else:
+                print("⚠️  Menambahkan .env ke .gitignore...")
                 f.write("\n# Environment variables\n.env\n.env.local\n.env.development\n.env.test\n.env.production\n")
-            print("✅ .env ditambahkan ke .gitignore")
+                print("✅ .env ditambahkan ke .gitignore")
     else:
         print("❌ File .gitignore tidak ditemukan!")
         return False
@@ -51,25 +90,12 @@ def setup_secure_environment():
     # 4. Check sensitive data di .env
     print("\n🔍 Checking sensitive data exposure...")
     
-    sensitive_patterns = [
-        'password',
-        'secret',
-        'key',
-        'token',
-        'auth'
-    ]
-    
-    with open(env_file, 'r') as f:
-        env_content = f.read()
-    
     warnings = []
-    for line in env_content.split('\n'):
-        if line.strip() and not line.startswith('#'):
-            for pattern in sensitive_patterns:
-                if pattern.lower() in line.lower():
-                    value = line.split('=')[1] if '=' in line else ''
-                    if value and value != 'your_password_here' and value != 'your-secret-key-here':
-                        warnings.append(line)
+    with open(env_file, 'r') as f:
+        for line in f:
+            match = SENSITIVE_RE.match(line)
+            if match and match.group(2) not in PLACEHOLDER_VALUES:
+                warnings.append(match.group(0))
     
     if warnings:
         print("⚠️  WARNING: Potensi sensitive data exposure:")
@@ -82,25 +108,16 @@ def setup_secure_environment():
     # 5. Check git status
     print("\n🔍 Checking git status...")
     try:
-        import subprocess
-        
-        result = subprocess.run(['git', 'status', '--porcelain'], 
-                              cwd=project_root, 
-                              capture_output=True, 
-                              text=True)
+        env_tracked = _env_tracked_in_git(project_root)
         
-        if result.returncode == 0:
-            changed_files = result.stdout.strip().split('\n')
-            env_tracked = any(' .env' in f for f in changed_files if f.strip())
-            
-            if env_tracked:
-                print("⚠️  WARNING: .env terdeteksi di git staging area!")
-                print("💡 Hapus dari git dengan: git reset HEAD .env")
-                return False
-            else:
-                print("✅ .env tidak ter-track di git")
-        else:
+        if env_tracked is None:
             print("ℹ️  Git repository tidak terdeteksi atau tidak ada changes")
+        elif env_tracked:
+            print("⚠️  WARNING: .env terdeteksi di git staging area!")
+            print("💡 Hapus dari git dengan: git reset HEAD .env")
+            return False
+        else:
+            print("✅ .env tidak ter-track di git")
             
     except FileNotFoundError:
         print("ℹ️  Git tidak terinstall")
@@ -113,8 +130,7 @@ def generate_secure_env_template():
     print("\n📝 GENERATING SECURE ENV TEMPLATE")
     print("=" * 50)
     
-    project_root = Path(__file__).parent.parent
-    secure_template = project_root / ".env.template"
+    secure_template = PROJECT_ROOT / ".env.template"
     
     template_content = """# MongoDB Cloud Configuration
 # Ganti dengan credentials Anda yang sebenarnya
@@ -148,8 +164,7 @@ LOG_LEVEL=INFO
 LOG_FILE=kalkulis.log
 """
     
-    with open(secure_template, 'w') as f:
-        f.write(template_content)
+    secure_template.write_text(template_content)
     
     print(f"✅ Secure template dibuat: {secure_template}")
     print("💡 Gunakan template ini untuk production setup")
@@ -8,12 +8,41 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.database import MongoDBConnection, init_db
+from pymongo import GEOSPHERE
 import logging
 from datetime import datetime
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Koleksi yang harus ada agar aplikasi siap dipakai
+REQUIRED_COLLECTIONS = frozenset({
+    'users', 'items', 'warehouses', 'farmers', 'merchants', 
+    'harvests', 'seeds', 'fertilizers', 'distribution_routes', 
+    'inventory_transactions', 'item_requests', 'notifications'
+})
+
+# Koleksi dengan field GeoJSON 'coordinates' yang dipakai query $near
+GEO_COLLECTIONS = ('farmers', 'merchants', 'warehouses')
+
+def ensure_geo_indexes(db):
+    """Buat index 2dsphere pada 'coordinates' (idempotent, aman dijalankan ulang)"""
+    for collection_name in GEO_COLLECTIONS:
+        try:
+            db[collection_name].create_index([('coordinates', GEOSPHERE)])
+            logger.info(f"🌍 2dsphere index ready on {collection_name}.coordinates")
+        except Exception as e:
+            # Dokumen lama dengan koordinat non-GeoJSON membuat build index gagal
+            logger.warning(f"⚠️ Could not create 2dsphere index on {collection_name}: {e}")
+
+def ensure_transaction_indexes(db):
+    """Index (transaction_type, transaction_date) untuk $match agregasi konsumsi di forecast_inventory"""
+    try:
+        db.inventory_transactions.create_index([('transaction_type', 1), ('transaction_date', 1)])
+        logger.info("📇 Index ready on inventory_transactions (transaction_type, transaction_date)")
+    except Exception as e:
+        logger.warning(f"⚠️ Could not create inventory_transactions index: {e}")
+
 def setup_cloud_database():
     """Setup database di MongoDB Cloud"""
     try:
@@ -30,14 +59,16 @@ def setup_cloud_database():
         
         # Verify setup
         db = MongoDBConnection.get_database()
+        ensure_geo_indexes(db)
+        ensure_transaction_indexes(db)
         collections = db.list_collection_names()
         
         logger.info(f"📊 Database: {db.name}")
         logger.info(f"📁 Collections created: {len(collections)}")
         
-        # Check default data
-        warehouses_count = db.warehouses.count_documents({})
-        users_count = db.users.count_documents({})
+        # Check default data (counts from collection metadata, no collection scan)
+        warehouses_count = db.warehouses.estimated_document_count()
+        users_count = db.users.estimated_document_count()
         
         logger.info(f"🏠 Default warehouses: {warehouses_count}")
         logger.info(f"👥 Default users: {users_count}")
@@ -66,16 +97,7 @@ def test_application_ready():
         db = MongoDBConnection.get_database()
         
         # Test collections exist
-        required_collections = [
-            'users', 'items', 'warehouses', 'farmers', 'merchants', 
-            'harvests', 'seeds', 'fertilizers', 'distribution_routes', 
-            'inventory_transactions', 'item_requests', 'notifications'
-        ]
-        
-        missing_collections = []
-        for collection in required_collections:
-            if collection not in db.list_collection_names():
-                missing_collections.append(collection)
+        missing_collections = sorted(REQUIRED_COLLECTIONS - set(db.list_collection_names()))
         
         if missing_collections:
             logger.error(f"❌ Missing collections: {missing_collections}")
@@ -88,13 +110,13 @@ def test_application_ready():
             return False
         
         # Test warehouses data
-        warehouse_count = db.warehouses.count_documents({})
+        warehouse_count = db.warehouses.estimated_document_count()
         if warehouse_count == 0:
             logger.error("❌ No warehouses found")
             return False
         
         logger.info("✅ Application is ready to use!")
-        logger.info(f"📊 {len(required_collections)} collections available")
+        logger.info(f"📊 {len(REQUIRED_COLLECTIONS)} collections available")
         logger.info(f"🏠 {warehouse_count} warehouses configured")
         logger.info("👤 Admin user ready for login")
         
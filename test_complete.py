@@ -6,6 +6,8 @@ Tests all major functions without Streamlit dependency
 
 import sys
 import os
+import functools
+from concurrent.futures import ThreadPoolExecutor
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from utils.sqlite_database import (
@@ -34,6 +36,7 @@ from utils.sqlite_database import (
     get_top_consumed_items
 )
 from utils.auth_new import login_user, register_user
+from utils.thread_output import ThreadOutput
 import logging
 import pandas as pd
 
@@ -41,6 +44,10 @@ import pandas as pd
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Users only change in test_user_management, which runs first; later tests share its
+# lookup instead of re-querying the users table (get_warehouses is already cached)
+_get_all_users = functools.lru_cache(maxsize=1)(get_all_users)
+
 class MockSessionState:
     """Mock Streamlit session state for testing"""
     def __init__(self):
@@ -53,6 +60,12 @@ class MockSessionState:
     def __getitem__(self, key):
         return getattr(self, key)
     
+    def __delitem__(self, key):
+        delattr(self, key)
+    
+    def __contains__(self, key):
+        return hasattr(self, key)
+    
     def get(self, key, default=None):
         return getattr(self, key, default)
 
@@ -86,8 +99,8 @@ def test_user_management():
         update_success = update_user(user['id'], {"full_name": "Test User Updated"})
         print(f"✅ User update: {'Success' if update_success else 'Failed'}")
     
-    # Test get all users
-    users = get_all_users()
+    # Test get all users (after the update, so the cached list is current)
+    users = _get_all_users()
     print(f"✅ Get all users: {len(users)} users found")
     
     return True
@@ -159,13 +172,11 @@ def test_farmer_merchant_operations():
     """Test farmer and merchant operations"""
     print("\n🔍 Testing Farmer & Merchant Operations...")
     
-    # Test farmers
-    farmers = get_all_users()  # Using this as a placeholder since get_farmers might not exist
-    print(f"✅ Users (including farmers): {len(farmers)} found")
-    
-    # Test merchants
-    merchants = get_all_users()  # Using this as a placeholder
-    print(f"✅ Users (including merchants): {len(merchants)} found")
+    # Users list stands in for both farmers and merchants (placeholder since
+    # get_farmers might not exist)
+    users = _get_all_users()
+    print(f"✅ Users (including farmers): {len(users)} found")
+    print(f"✅ Users (including merchants): {len(users)} found")
     
     return True
 
@@ -202,7 +213,7 @@ def test_notification_operations():
     print("\n🔍 Testing Notification Operations...")
     
     # Test create notification
-    users = get_all_users()
+    users = _get_all_users()
     if users:
         success, message = create_notification(
             users[0]['id'],
@@ -221,46 +232,37 @@ def test_data_integrity():
     """Test data integrity and relationships"""
     print("\n🔍 Testing Data Integrity...")
     
-    db = get_database()
-    conn = db._get_connection()
-    cursor = conn.cursor()
+    # Shared connection owned by the database singleton; only the cursor is closed here
+    cursor = get_database()._get_connection().cursor()
     
     # Test foreign key constraints
     try:
-        # Test items reference warehouses
+        # Orphan references (items/harvests -> warehouses) and unique constraints,
+        # all counted in a single statement
         cursor.execute('''
-            SELECT COUNT(*) as count FROM items i 
-            LEFT JOIN warehouses w ON i.warehouse_id = w.id 
-            WHERE i.warehouse_id IS NOT NULL AND w.id IS NULL
+            SELECT
+                (SELECT COUNT(*) FROM items i 
+                 LEFT JOIN warehouses w ON i.warehouse_id = w.id 
+                 WHERE i.warehouse_id IS NOT NULL AND w.id IS NULL),
+                (SELECT COUNT(*) FROM harvests h 
+                 LEFT JOIN warehouses w ON h.warehouse_id = w.id 
+                 WHERE h.warehouse_id IS NOT NULL AND w.id IS NULL),
+                (SELECT COUNT(*) - COUNT(DISTINCT username) FROM users),
+                (SELECT COUNT(*) - COUNT(DISTINCT name) FROM warehouses)
         ''')
-        orphan_items = cursor.fetchone()[0]
+        orphan_items, orphan_harvests, duplicate_users, duplicate_warehouses = cursor.fetchone()
         print(f"✅ Orphan items (no warehouse): {orphan_items}")
-        
-        # Test harvests references
-        cursor.execute('''
-            SELECT COUNT(*) as count FROM harvests h 
-            LEFT JOIN warehouses w ON h.warehouse_id = w.id 
-            WHERE h.warehouse_id IS NOT NULL AND w.id IS NULL
-        ''')
-        orphan_harvests = cursor.fetchone()[0]
         print(f"✅ Orphan harvests (no warehouse): {orphan_harvests}")
-        
-        # Test unique constraints
-        cursor.execute("SELECT COUNT(*) - COUNT(DISTINCT username) as duplicates FROM users")
-        duplicate_users = cursor.fetchone()[0]
         print(f"✅ Duplicate usernames: {duplicate_users}")
-        
-        cursor.execute("SELECT COUNT(*) - COUNT(DISTINCT name) as duplicates FROM warehouses")
-        duplicate_warehouses = cursor.fetchone()[0]
         print(f"✅ Duplicate warehouse names: {duplicate_warehouses}")
         
-        conn.close()
         return orphan_items == 0 and orphan_harvests == 0 and duplicate_users == 0 and duplicate_warehouses == 0
         
     except Exception as e:
         print(f"❌ Data integrity test failed: {e}")
-        conn.close()
         return False
+    finally:
+        cursor.close()
 
 def test_performance():
     """Test basic performance metrics"""
@@ -293,22 +295,51 @@ def cleanup_test_data():
         # Remove test user
         test_user = get_user_by_username("testuser1")
         if test_user:
-            db = get_database()
-            conn = db._get_connection()
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM users WHERE username = 'testuser1'")
-            conn.commit()
-            conn.close()
+            # Reuse the shared connection; the context manager commits the delete
+            with get_database()._get_connection() as conn:
+                conn.execute("DELETE FROM users WHERE username = 'testuser1'")
             print("✅ Test data cleaned up")
     except Exception as e:
         print(f"⚠️  Cleanup warning: {e}")
 
+def _run_test(output, test):
+    """Run one test with its output captured; returns (passed, output)"""
+    output.capture()
+    passed = False
+    try:
+        if test():
+            passed = True
+            print(f"✅ {test.__name__} PASSED")
+        else:
+            print(f"❌ {test.__name__} FAILED")
+    except Exception as e:
+        print(f"❌ {test.__name__} ERROR: {e}")
+    print()
+    return passed, output.release()
+
 def main():
     """Run all comprehensive tests"""
     print("🚀 Starting Comprehensive System Tests")
     print("=" * 60)
     
-    tests = [
+    # All tests share one sqlite3 connection, so a commit/rollback in one thread
+    # would also commit or discard another thread's in-flight writes. Only the
+    # read-only tests run concurrently; tests that write run serially before
+    # them, and the integrity check and timing-sensitive performance test run last
+    writer_tests = [
+        test_user_management,  # creates the test user and replaces st.session_state
+        test_item_management,
+        test_harvest_operations,
+        test_notification_operations
+    ]
+    read_only_tests = [
+        test_warehouse_management,
+        test_transaction_operations,
+        test_farmer_merchant_operations
+    ]
+    last_tests = [test_data_integrity, test_performance]
+    
+    report_order = [
         test_user_management,
         test_warehouse_management,
         test_item_management,
@@ -319,20 +350,22 @@ def main():
         test_data_integrity,
         test_performance
     ]
+    total = len(report_order)
     
-    passed = 0
-    total = len(tests)
-    
-    for test in tests:
-        try:
-            if test():
-                passed += 1
-                print(f"✅ {test.__name__} PASSED")
-            else:
-                print(f"❌ {test.__name__} FAILED")
-        except Exception as e:
-            print(f"❌ {test.__name__} ERROR: {e}")
-        print()
+    output = ThreadOutput(sys.stdout)
+    sys.stdout = output
+    try:
+        results = {test: _run_test(output, test) for test in writer_tests}
+        with ThreadPoolExecutor(max_workers=len(read_only_tests)) as executor:
+            results.update(zip(read_only_tests, executor.map(lambda test: _run_test(output, test), read_only_tests)))
+        results.update((test, _run_test(output, test)) for test in last_tests)
+    finally:
+        sys.stdout = output._stream
+    
+    # Report in the original test order
+    for test in report_order:
+        print(results[test][1], end="")
+    passed = sum(1 for test_passed, _ in results.values() if test_passed)
     
     print("=" * 60)
     print(f"📊 Test Results: {passed}/{total} tests passed")
@@ -23,6 +23,9 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Users created by these tests; removed together in cleanup_test_data
+TEST_USERNAMES = ("testuser",)
+
 def test_database_connection():
     """Test basic database connection"""
     print("🔍 Testing Database Connection...")
@@ -50,16 +53,14 @@ def test_table_creation():
         ]
         
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        existing_tables = [row[0] for row in cursor.fetchall()]
-        
-        for table in required_tables:
-            if table in existing_tables:
-                print(f"✅ Table '{table}' exists")
-            else:
-                print(f"❌ Table '{table}' missing")
-                return False
+        existing_tables = {row[0] for row in cursor.fetchall()}
+        
+        missing_tables = [table for table in required_tables if table not in existing_tables]
+        if missing_tables:
+            print(f"❌ Missing tables: {', '.join(missing_tables)}")
+            return False
                 
-        print("✅ All required tables exist")
+        print(f"✅ All required tables exist ({len(required_tables)})")
         return True
     except Exception as e:
         print(f"❌ Table creation test failed: {e}")
@@ -98,19 +99,19 @@ def test_user_operations():
         
         # Mock session state for testing
         if not hasattr(st, 'session_state'):
-            class MockSessionState:
+            class MockSessionState(dict):
+                # Item access stays native dict; attribute access maps onto it
                 def __init__(self):
-                    self.authenticated = False
-                    self.user = None
-                
-                def __setitem__(self, key, value):
-                    setattr(self, key, value)
+                    super().__init__(authenticated=False, user=None)
                 
-                def __getitem__(self, key):
-                    return getattr(self, key)
+                def __getattr__(self, key):
+                    try:
+                        return self[key]
+                    except KeyError:
+                        raise AttributeError(key)
                 
-                def get(self, key, default=None):
-                    return getattr(self, key, default)
+                def __setattr__(self, key, value):
+                    self[key] = value
             
             st.session_state = MockSessionState()
         
@@ -191,13 +192,13 @@ def cleanup_test_data():
     """Clean up test data"""
     print("\n🧹 Cleaning up test data...")
     try:
-        db = get_database()
-        conn = db._get_connection()
-        cursor = conn.cursor()
+        # Reuse the shared connection; the context manager commits the delete
+        with get_database()._get_connection() as conn:
+            placeholders = ", ".join("?" * len(TEST_USERNAMES))
+            conn.execute(f"DELETE FROM users WHERE username IN ({placeholders})", TEST_USERNAMES)
         
-        # Remove test user
-        cursor.execute("DELETE FROM users WHERE username = 'testuser'")
-        conn.commit()
+        # Fold the WAL back into the database so it doesn't grow across runs
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
         print("✅ Test data cleaned up")
     except Exception as e:
         print(f"⚠️  Cleanup warning: {e}")
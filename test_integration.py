@@ -21,14 +21,17 @@ print(f'\nTest coordinates for Bandung: {coords}')
 
 # Test finding nearby locations (if we have data)
 if coords:
+    # GeoJSON point shared by the test farmer and the $near query
+    bandung_point = {
+        'type': 'Point',
+        'coordinates': [coords['lng'], coords['lat']]
+    }
+    
     # Create a test farmer with coordinates in GeoJSON format
     test_farmer = {
         'name': 'Petani Test',
         'address': 'Bandung, Jawa Barat, Indonesia',
-        'coordinates': {
-            'type': 'Point',
-            'coordinates': [coords['lng'], coords['lat']]
-        },
+        'coordinates': bandung_point,
         'phone': '08123456789',
         'land_area': 2.5,
         'crop_type': 'Padi'
@@ -42,10 +45,7 @@ if coords:
     nearby_query = {
         'coordinates': {
             '$near': {
-                '$geometry': {
-                    'type': 'Point',
-                    'coordinates': [coords['lng'], coords['lat']]
-                },
+                '$geometry': bandung_point,
                 '$maxDistance': 10000  # 10km radius in meters
             }
         }
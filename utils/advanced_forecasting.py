@@ -1,20 +1,62 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+import functools
+import hashlib
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple, Union
 
 # Try to import advanced libraries
 try:
     from statsmodels.tsa.arima.model import ARIMA
     from statsmodels.tsa.holtwinters import ExponentialSmoothing
-    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
     STATS_AVAILABLE = True
 except ImportError:
     STATS_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Shared worker pool for fitting/forecasting ensemble members concurrently
+_EXECUTOR = ThreadPoolExecutor(max_workers=2)
+
+# Fitted results per (model, params, series); FIFO eviction keeps memory bounded
+_FIT_CACHE: Dict[tuple, object] = {}
+_FIT_CACHE_MAX = 64
+_FIT_CACHE_LOCK = threading.Lock()
+
+def _fit_cache_key(kind: str, params: tuple, data: pd.Series) -> tuple:
+    """Key a fitted model on its parameters and the exact series contents"""
+    values = np.ascontiguousarray(data.to_numpy(dtype=np.float64))
+    digest = hashlib.blake2b(values.tobytes()).digest()
+    return (kind, params, data.index[0], data.index[-1], len(data), digest)
+
+def _cached_fit(key: tuple, fit):
+    """Return the cached fit result for key, fitting and storing it on a miss"""
+    with _FIT_CACHE_LOCK:
+        result = _FIT_CACHE.get(key)
+    if result is not None:
+        return result
+    
+    result = fit()
+    with _FIT_CACHE_LOCK:
+        _FIT_CACHE[key] = result
+        while len(_FIT_CACHE) > _FIT_CACHE_MAX:
+            del _FIT_CACHE[next(iter(_FIT_CACHE))]
+    return result
+
+@functools.lru_cache(maxsize=32)
+def _dates(last_date: pd.Timestamp, periods: int, freq) -> pd.DatetimeIndex:
+    """Forecast date index after last_date; shared by every forecaster in an ensemble"""
+    return pd.date_range(start=last_date + timedelta(days=1), periods=periods, freq=freq)
+
+def _forecast_frame(dates: pd.DatetimeIndex, arr: np.ndarray) -> pd.DataFrame:
+    """Wrap a (periods, 3) forecast/lower/upper array in the forecast DataFrame layout"""
+    df = pd.DataFrame(arr, columns=['forecast', 'confidence_lower', 'confidence_upper'])
+    df.insert(0, 'date', dates)
+    return df
+
 class BaseForecaster:
     """Base class for forecasters"""
     def fit(self, data: pd.Series):
@@ -29,17 +71,20 @@ class ARIMAForecaster(BaseForecaster):
         self.model = None
         self.fit_result = None
         self.last_date = None
+        self.freq = None
         
     def fit(self, data: pd.Series):
-        if not STATS_AVAILABLE:
-            return False
-            
         try:
             self.last_date = data.index[-1]
+            self.freq = getattr(data.index, 'freq', None) or 'D'
             # Simple auto-arima like logic or fixed order for stability
             # Using (1,1,1) as a safe default for general purpose
-            self.model = ARIMA(data, order=(1, 1, 1))
-            self.fit_result = self.model.fit()
+            order = (1, 1, 1)
+            self.fit_result = _cached_fit(
+                _fit_cache_key('arima', order, data),
+                lambda: ARIMA(data, order=order).fit()
+            )
+            self.model = self.fit_result.model
             return True
         except Exception as e:
             logger.error(f"Error fitting ARIMA: {e}")
@@ -54,21 +99,16 @@ class ARIMAForecaster(BaseForecaster):
             forecast_values = forecast_result.predicted_mean
             conf_int = forecast_result.conf_int()
             
-            dates = pd.date_range(start=self.last_date + timedelta(days=1), periods=periods, freq=self.last_date.freq or 'D')
+            dates = _dates(self.last_date, periods, self.freq)
             
-            df = pd.DataFrame({
-                'date': dates,
-                'forecast': forecast_values.values,
-                'confidence_lower': conf_int.iloc[:, 0].values,
-                'confidence_upper': conf_int.iloc[:, 1].values
-            })
+            arr = np.empty((periods, 3))
+            arr[:, 0] = forecast_values.to_numpy()
+            arr[:, 1:] = np.asarray(conf_int)[:, :2]
             
             # Ensure no negative values for physical quantities
-            df['forecast'] = df['forecast'].apply(lambda x: max(0, x))
-            df['confidence_lower'] = df['confidence_lower'].apply(lambda x: max(0, x))
-            df['confidence_upper'] = df['confidence_upper'].apply(lambda x: max(0, x))
+            np.clip(arr, 0, None, out=arr)
             
-            return df
+            return _forecast_frame(dates, arr)
         except Exception as e:
             logger.error(f"Error forecasting ARIMA: {e}")
             return pd.DataFrame()
@@ -79,26 +119,31 @@ class ExponentialSmoothingForecaster(BaseForecaster):
         self.model = None
         self.fit_result = None
         self.last_date = None
+        self.freq = None
         
     def fit(self, data: pd.Series, seasonal_periods=12):
-        if not STATS_AVAILABLE:
-            return False
-            
         try:
             self.last_date = data.index[-1]
-            # Additive trend and seasonality
-            if len(data) >= seasonal_periods * 2:
-                self.model = ExponentialSmoothing(
-                    data, 
-                    trend='add', 
-                    seasonal='add', 
-                    seasonal_periods=seasonal_periods
-                )
-            else:
-                # Fallback to simple smoothing if not enough data
-                self.model = ExponentialSmoothing(data, trend='add')
-                
-            self.fit_result = self.model.fit()
+            self.freq = getattr(data.index, 'freq', None) or 'D'
+            def fit_model():
+                # Additive trend and seasonality
+                if len(data) >= seasonal_periods * 2:
+                    model = ExponentialSmoothing(
+                        data, 
+                        trend='add', 
+                        seasonal='add', 
+                        seasonal_periods=seasonal_periods
+                    )
+                else:
+                    # Fallback to simple smoothing if not enough data
+                    model = ExponentialSmoothing(data, trend='add')
+                return model.fit()
+            
+            self.fit_result = _cached_fit(
+                _fit_cache_key('holt_winters', (seasonal_periods,), data),
+                fit_model
+            )
+            self.model = self.fit_result.model
             return True
         except Exception as e:
             logger.error(f"Error fitting Exponential Smoothing: {e}")
@@ -111,25 +156,23 @@ class ExponentialSmoothingForecaster(BaseForecaster):
         try:
             forecast_values = self.fit_result.forecast(periods)
             
-            dates = pd.date_range(start=self.last_date + timedelta(days=1), periods=periods, freq=self.last_date.freq or 'D')
+            dates = _dates(self.last_date, periods, self.freq)
             
             # Simple confidence intervals (ES doesn't provide them natively easily in statsmodels)
             # Using 10% margin as placeholder or standard deviation of residuals if available
             std_resid = np.std(self.fit_result.resid) if hasattr(self.fit_result, 'resid') else forecast_values.mean() * 0.1
             
-            df = pd.DataFrame({
-                'date': dates,
-                'forecast': forecast_values.values,
-                'confidence_lower': forecast_values.values - 1.96 * std_resid,
-                'confidence_upper': forecast_values.values + 1.96 * std_resid
-            })
+            v = forecast_values.to_numpy()
+            margin = 1.96 * std_resid
+            arr = np.empty((periods, 3))
+            arr[:, 0] = v
+            np.subtract(v, margin, out=arr[:, 1])
+            np.add(v, margin, out=arr[:, 2])
             
             # Ensure no negative values
-            df['forecast'] = df['forecast'].apply(lambda x: max(0, x))
-            df['confidence_lower'] = df['confidence_lower'].apply(lambda x: max(0, x))
-            df['confidence_upper'] = df['confidence_upper'].apply(lambda x: max(0, x))
+            np.clip(arr, 0, None, out=arr)
             
-            return df
+            return _forecast_frame(dates, arr)
         except Exception as e:
             logger.error(f"Error forecasting ES: {e}")
             return pd.DataFrame()
@@ -141,62 +184,73 @@ class EnsembleForecaster(BaseForecaster):
         self.weights = []
         
     def fit(self, data: pd.Series):
-        if not STATS_AVAILABLE:
-            return False
-            
         self.forecasters = [
             ARIMAForecaster(),
             ExponentialSmoothingForecaster()
         ]
         
-        valid_forecasters = []
-        for f in self.forecasters:
-            if f.fit(data):
-                valid_forecasters.append(f)
-        
-        self.forecasters = valid_forecasters
+        fitted = list(_EXECUTOR.map(lambda f: f.fit(data), self.forecasters))
+        self.forecasters = [f for f, ok in zip(self.forecasters, fitted) if ok]
         return len(self.forecasters) > 0
         
     def forecast(self, periods: int) -> pd.DataFrame:
         if not self.forecasters:
             return pd.DataFrame()
             
-        results = []
-        for f in self.forecasters:
-            res = f.forecast(periods)
-            if not res.empty:
-                results.append(res)
+        results = [
+            res for res in _EXECUTOR.map(lambda f: f.forecast(periods), self.forecasters)
+            if not res.empty
+        ]
         
         if not results:
             return pd.DataFrame()
             
         # Average forecasts
-        final_df = results[0].copy()
-        for col in ['forecast', 'confidence_lower', 'confidence_upper']:
-            final_df[col] = np.mean([r[col].values for r in results], axis=0)
+        cols = ['forecast', 'confidence_lower', 'confidence_upper']
+        stack = np.empty((len(results), periods, len(cols)))
+        for i, r in enumerate(results):
+            stack[i] = r[cols].to_numpy(dtype=np.float64)
+        arr = np.empty((periods, len(cols)))
+        np.mean(stack, axis=0, out=arr)
             
-        return final_df
+        return _forecast_frame(results[0]['date'].to_numpy(), arr)
+
+if not STATS_AVAILABLE:
+    # Without statsmodels fitting always fails; decided once at import time
+    def _fit_unavailable(self, data: pd.Series, *args, **kwargs):
+        return False
+    
+    ARIMAForecaster.fit = _fit_unavailable
+    ExponentialSmoothingForecaster.fit = _fit_unavailable
+    EnsembleForecaster.fit = _fit_unavailable
 
 def calculate_forecast_metrics(actual, predicted):
     """Calculate accuracy metrics"""
-    if not STATS_AVAILABLE:
-        return {}
-        
     try:
         # Ensure same length
         min_len = min(len(actual), len(predicted))
-        actual = actual[:min_len]
-        predicted = predicted[:min_len]
+        actual = np.asarray(actual, dtype=np.float64)[:min_len]
+        predicted = np.asarray(predicted, dtype=np.float64)[:min_len]
+        if min_len == 0:
+            raise ValueError("actual and predicted must not be empty")
         
-        mae = mean_absolute_error(actual, predicted)
-        rmse = np.sqrt(mean_squared_error(actual, predicted))
+        errors = actual - predicted
+        mae = float(np.mean(np.abs(errors)))
+        ss_res = float(np.dot(errors, errors))
+        rmse = float(np.sqrt(ss_res / min_len))
         
         # Handle zero division for MAPE
         with np.errstate(divide='ignore', invalid='ignore'):
-            mape = np.mean(np.abs((actual - predicted) / actual)) * 100
-            mape = np.nan_to_num(mape, nan=0.0, posinf=0.0, neginf=0.0)
-            
-        r2 = r2_score(actual, predicted)
+            mape = np.mean(np.abs(errors / actual)) * 100
+            mape = float(np.nan_to_num(mape, nan=0.0, posinf=0.0, neginf=0.0))
+        
+        # Same convention as sklearn's r2_score for a constant series
+        deviations = actual - actual.mean()
+        ss_tot = float(np.dot(deviations, deviations))
+        if ss_tot == 0:
+            r2 = 1.0 if ss_res == 0 else 0.0
+        else:
+            r2 = 1.0 - ss_res / ss_tot
         
         return {
             'mae': mae,
@@ -3,7 +3,8 @@ import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 from datetime import datetime, timedelta
-from utils.sqlite_database import get_database
+from utils.sqlite_database import get_database, TRANSACTION_ROLLUP_INDEX_SQL
+from utils.caching import register_invalidation
 from typing import Dict, List, Optional
 import numpy as np
 import logging
@@ -11,148 +12,195 @@ import logging
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Streamlit reruns the page on every interaction; analytics results are
+# cached for a few minutes (the leading underscore keeps `_self` out of the key).
+# Item writes clear them right away through clear_analytics_cache
+ANALYTICS_CACHE_TTL = 300
+
+# Rows shown in the "top turnover" table
+TOP_TURNOVER_LIMIT = 10
+
+def _top_k_indices(values: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest values, descending, ties in original order (like nlargest)"""
+    if len(values) > k:
+        # Only values at or above the k-th largest can make the cut
+        kth = np.partition(values, len(values) - k)[len(values) - k]
+        candidates = np.flatnonzero(values >= kth)
+    else:
+        candidates = np.arange(len(values))
+    return candidates[np.argsort(-values[candidates], kind='stable')][:k]
+
+def _normalize_turnover(turnover):
+    """Turnover score 0-100 (ideal is 4-6 times per year); works on scalars and arrays"""
+    turnover = np.asarray(turnover, dtype=np.float64)
+    return np.where(
+        (turnover >= 4) & (turnover <= 6), 100.0,
+        np.where(turnover < 4,
+                 np.where(turnover > 0, turnover / 4 * 100, 0.0),
+                 np.maximum(0.0, 100 - (turnover - 6) * 10))
+    )
+
+def _as_object(column: pd.Series) -> pd.Series:
+    """Object-dtype copy of a text column with SQL NULLs kept as None"""
+    return column.astype(object).where(column.notna(), None)
+
 class InventoryAnalytics:
     def __init__(self):
         self.db = get_database()
+        self._rollups = {}
     
-    def get_inventory_turnover(self, days: int = 30) -> Dict:
-        """Calculate inventory turnover rate"""
-        try:
+    def _get_transaction_rollup(self, days: int) -> List[Dict]:
+        """Per item/type/day transaction totals for the period.
+        
+        Turnover, movement and health all derive from this single scan of
+        inventory_transactions; it is kept per instance, so one dashboard
+        render reads the table once per period. The date-range search is
+        pinned to the covering index, which unanalyzed databases would
+        otherwise pass over for the item_id index; the index is created
+        first if this database predates it, since INDEXED BY fails on a
+        missing index.
+        """
+        if days not in self._rollups:
             conn = self.db._get_connection()
             cursor = conn.cursor()
             
+            if not self._rollups:
+                cursor.execute(TRANSACTION_ROLLUP_INDEX_SQL)
+            
             start_date = (datetime.now() - timedelta(days=days)).isoformat()
             
-            # Get all items
-            cursor.execute("SELECT * FROM items")
-            items = [dict(row) for row in cursor.fetchall()]
-            
-            turnover_data = []
-            
-            for item in items:
-                # Get consumption data (outbound transactions)
-                cursor.execute("""
-                    SELECT SUM(quantity) as total_consumed
-                    FROM inventory_transactions
-                    WHERE item_id = ? 
-                    AND transaction_type = 'out'
-                    AND transaction_date >= ?
-                """, (item['id'], start_date))
-                
-                result = cursor.fetchone()
-                total_consumed = result['total_consumed'] if result and result['total_consumed'] else 0
-                
-                current_stock = item.get('current_stock', 0) or 0
-                avg_stock = current_stock  # Simplified - would need opening stock for accurate calculation
-                
-                # Calculate turnover rate
-                if avg_stock > 0:
-                    turnover_rate = (total_consumed / avg_stock) * (365 / days)
-                else:
-                    turnover_rate = 0
-                
-                turnover_data.append({
-                    'item_name': item['name'],
-                    'category': item.get('category', 'N/A'),
-                    'turnover_rate': turnover_rate,
-                    'total_consumed': total_consumed,
-                    'avg_stock': avg_stock,
-                    'current_stock': current_stock
-                })
+            cursor.execute("""
+                SELECT item_id, transaction_type,
+                       substr(transaction_date, 1, 10) as day,
+                       SUM(quantity) as total_quantity,
+                       COUNT(*) as total_transactions
+                FROM inventory_transactions INDEXED BY idx_transactions_date_type_item
+                WHERE transaction_date >= ?
+                GROUP BY item_id, transaction_type, day
+            """, (start_date,))
+            self._rollups[days] = [dict(row) for row in cursor.fetchall()]
+        
+        return self._rollups[days]
+    
+    @st.cache_data(ttl=ANALYTICS_CACHE_TTL, show_spinner=False)
+    def get_inventory_turnover(_self, days: int = 30) -> Dict:
+        """Calculate inventory turnover rate"""
+        try:
+            conn = _self.db._get_connection()
+            
+            # Consumption per item (outbound transactions), summed in one groupby
+            rollup_df = pd.DataFrame.from_records(
+                _self._get_transaction_rollup(days),
+                columns=['item_id', 'transaction_type', 'total_quantity']
+            )
+            outbound = rollup_df[rollup_df['transaction_type'] == 'out']
+            consumed = outbound.groupby('item_id')['total_quantity'].sum()
+            
+            # Loaded straight into columns, without a per-row dict
+            items_df = pd.read_sql_query("SELECT id, name, category, current_stock FROM items", conn)
+            
+            if items_df.empty:
+                return {'turnover_data': [], 'top_turnover': [], 'avg_turnover': 0, 'total_items': 0}
+            
+            # Column arrays; the turnover math runs once over all items
+            current_stock = items_df['current_stock'].fillna(0).to_numpy(dtype=np.float64)
+            total_consumed = items_df['id'].map(consumed).fillna(0).to_numpy(dtype=np.float64)
+            avg_stock = current_stock  # Simplified - would need opening stock for accurate calculation
+            
+            # Calculate turnover rate (0 where there is no stock)
+            turnover_rate = np.divide(total_consumed, avg_stock, out=np.zeros_like(avg_stock), where=avg_stock > 0) * (365 / days)
+            
+            turnover_df = pd.DataFrame({
+                'item_name': _as_object(items_df['name']),
+                'category': _as_object(items_df['category']),
+                'turnover_rate': turnover_rate,
+                'total_consumed': total_consumed,
+                'avg_stock': avg_stock,
+                'current_stock': current_stock
+            })
+            
+            top = turnover_df.iloc[_top_k_indices(turnover_rate, TOP_TURNOVER_LIMIT)]
             
             return {
-                'turnover_data': turnover_data,
-                'avg_turnover': np.mean([d['turnover_rate'] for d in turnover_data]) if turnover_data else 0,
-                'total_items': len(turnover_data)
+                'turnover_data': turnover_df.to_dict('records'),
+                'top_turnover': top[['item_name', 'category', 'turnover_rate']].to_dict('records'),
+                'avg_turnover': float(turnover_rate.mean()),
+                'total_items': len(turnover_df)
             }
             
         except Exception as e:
             logger.error(f"Error calculating turnover: {e}")
-            return {'turnover_data': [], 'avg_turnover': 0, 'total_items': 0}
+            return {'turnover_data': [], 'top_turnover': [], 'avg_turnover': 0, 'total_items': 0}
     
-    def get_stock_movement_analysis(self, days: int = 30) -> Dict:
+    @st.cache_data(ttl=ANALYTICS_CACHE_TTL, show_spinner=False)
+    def get_stock_movement_analysis(_self, days: int = 30) -> Dict:
         """Analyze stock movement patterns"""
         try:
-            conn = self.db._get_connection()
-            cursor = conn.cursor()
-            
-            start_date = (datetime.now() - timedelta(days=days)).isoformat()
-            
-            # Get all transactions in the period
-            cursor.execute("""
-                SELECT * FROM inventory_transactions
-                WHERE transaction_date >= ?
-            """, (start_date,))
-            
-            transactions = [dict(row) for row in cursor.fetchall()]
-            
-            # Group by transaction type
-            movement_summary = {}
-            
-            for transaction in transactions:
-                transaction_type = transaction.get('transaction_type', 'unknown')
-                quantity = transaction.get('quantity', 0) or 0
-                
-                if transaction_type not in movement_summary:
-                    movement_summary[transaction_type] = {
-                        'total_transactions': 0,
-                        'total_quantity': 0,
-                        'avg_quantity': 0
-                    }
-                
-                movement_summary[transaction_type]['total_transactions'] += 1
-                movement_summary[transaction_type]['total_quantity'] += quantity
-            
-            # Calculate averages
-            for trans_type in movement_summary:
-                summary = movement_summary[trans_type]
-                if summary['total_transactions'] > 0:
-                    summary['avg_quantity'] = summary['total_quantity'] / summary['total_transactions']
+            rollup = _self._get_transaction_rollup(days)
+            if not rollup:
+                return {'movement_summary': {}, 'daily_df': pd.DataFrame(), 'total_transactions': 0}
+            
+            # Encode transaction type and day as small ints (first-seen order)
+            type_codes = {}
+            day_codes = {}
+            type_idx = np.array([type_codes.setdefault(row['transaction_type'], len(type_codes)) for row in rollup])
+            day_idx = np.array([
+                day_codes.setdefault(row['day'] if row['day'] is not None else 'None', len(day_codes))
+                for row in rollup
+            ])
+            quantities = np.array([row['total_quantity'] or 0 for row in rollup], dtype=np.float64)
+            counts = np.array([row['total_transactions'] for row in rollup], dtype=np.int64)
+            
+            # Group by transaction type, and by type x day for the trend
+            n_types, n_days = len(type_codes), len(day_codes)
+            quantity_by_type = np.bincount(type_idx, weights=quantities, minlength=n_types)
+            count_by_type = np.bincount(type_idx, weights=counts, minlength=n_types)
+            cells = type_idx * n_days + day_idx
+            quantity_by_day = np.bincount(cells, weights=quantities, minlength=n_types * n_days).reshape(n_types, n_days)
+            
+            movement_summary = {
+                trans_type: {
+                    'total_transactions': int(count_by_type[code]),
+                    'total_quantity': float(quantity_by_type[code]),
+                    'avg_quantity': float(quantity_by_type[code] / count_by_type[code])
+                }
+                for trans_type, code in type_codes.items()
+            }
             
-            # Daily movement trend
-            daily_movement = {}
-            for transaction in transactions:
-                transaction_date = transaction.get('transaction_date', '')
-                if isinstance(transaction_date, str):
-                    try:
-                        date_obj = datetime.fromisoformat(transaction_date)
-                        date_str = date_obj.strftime('%Y-%m-%d')
-                    except:
-                        date_str = transaction_date[:10] if len(transaction_date) >= 10 else transaction_date
-                else:
-                    date_str = str(transaction_date)
-                
-                trans_type = transaction.get('transaction_type', 'unknown')
-                quantity = transaction.get('quantity', 0) or 0
-                
-                if date_str not in daily_movement:
-                    daily_movement[date_str] = {}
-                
-                if trans_type not in daily_movement[date_str]:
-                    daily_movement[date_str][trans_type] = 0
-                
-                daily_movement[date_str][trans_type] += quantity
+            # Day x type trend table, ready to plot (days without a type are 0)
+            daily_df = pd.DataFrame(
+                quantity_by_day.T,
+                index=pd.to_datetime(list(day_codes)),
+                columns=list(type_codes)
+            ).sort_index()
+            total_transactions = int(counts.sum())
             
             return {
                 'movement_summary': movement_summary,
-                'daily_movement': daily_movement,
-                'total_transactions': len(transactions)
+                'daily_df': daily_df,
+                'total_transactions': total_transactions
             }
             
         except Exception as e:
             logger.error(f"Error analyzing stock movement: {e}")
-            return {'movement_summary': {}, 'daily_movement': {}, 'total_transactions': 0}
+            return {'movement_summary': {}, 'daily_df': pd.DataFrame(), 'total_transactions': 0}
     
-    def get_inventory_health_score(self) -> Dict:
+    @st.cache_data(ttl=ANALYTICS_CACHE_TTL, show_spinner=False)
+    def get_inventory_health_score(_self) -> Dict:
         """Calculate overall inventory health score"""
         try:
-            conn = self.db._get_connection()
+            conn = _self.db._get_connection()
             cursor = conn.cursor()
             
-            # Get all items
-            cursor.execute("SELECT * FROM items")
-            items = [dict(row) for row in cursor.fetchall()]
-            total_items = len(items)
+            # Item counts for the stock factors, aggregated in one statement
+            cursor.execute("""
+                SELECT COUNT(*) as total_items,
+                       SUM(COALESCE(current_stock, 0) > 0) as in_stock_items,
+                       SUM(COALESCE(current_stock, 0) > COALESCE(min_stock, 0)) as adequate_stock_items
+                FROM items
+            """)
+            counts = cursor.fetchone()
+            total_items = counts['total_items']
             
             if total_items == 0:
                 return {'score': 0, 'factors': {}, 'total_items': 0}
@@ -161,37 +209,17 @@ class InventoryAnalytics:
             factors = {}
             
             # 1. Stock availability factor
-            in_stock_items = len([item for item in items if (item.get('current_stock', 0) or 0) > 0])
-            factors['stock_availability'] = (in_stock_items / total_items) * 100
+            factors['stock_availability'] = (counts['in_stock_items'] / total_items) * 100
             
             # 2. Stock level factor (items with adequate stock)
-            adequate_stock_items = len([
-                item for item in items 
-                if (item.get('current_stock', 0) or 0) > (item.get('min_stock', 0) or 0)
-            ])
-            factors['stock_adequacy'] = (adequate_stock_items / total_items) * 100
+            factors['stock_adequacy'] = (counts['adequate_stock_items'] / total_items) * 100
             
             # 3. Turnover factor
-            turnover_data = self.get_inventory_turnover(30)
-            avg_turnover = turnover_data['avg_turnover']
-            # Normalize turnover (ideal is 4-6 times per year)
-            if avg_turnover >= 4 and avg_turnover <= 6:
-                factors['turnover'] = 100
-            elif avg_turnover < 4:
-                factors['turnover'] = (avg_turnover / 4) * 100 if avg_turnover > 0 else 0
-            else:
-                factors['turnover'] = max(0, 100 - ((avg_turnover - 6) * 10))
-            
-            # 4. Movement factor (recent activity)
-            thirty_days_ago = (datetime.now() - timedelta(days=30)).isoformat()
-            cursor.execute("""
-                SELECT COUNT(*) as count
-                FROM inventory_transactions
-                WHERE transaction_date >= ?
-            """, (thirty_days_ago,))
+            turnover_data = _self.get_inventory_turnover(30)
+            factors['turnover'] = float(_normalize_turnover(turnover_data['avg_turnover']))
             
-            result = cursor.fetchone()
-            recent_transactions = result['count'] if result else 0
+            # 4. Movement factor (recent activity); same cached 30-day analysis the dashboard shows
+            recent_transactions = _self.get_stock_movement_analysis(30)['total_transactions']
             
             # Assume 30 transactions per month is good
             factors['movement'] = min(100, (recent_transactions / 30) * 100)
@@ -313,7 +341,7 @@ class InventoryAnalytics:
             
             # Display top items by turnover
             st.subheader("Item dengan Perputaran Tertinggi")
-            top_turnover = df.nlargest(10, 'turnover_rate')[['item_name', 'category', 'turnover_rate']]
+            top_turnover = pd.DataFrame(turnover_data['top_turnover'])
             st.dataframe(top_turnover, use_container_width=True)
             
             # Turnover distribution chart
@@ -343,21 +371,22 @@ class InventoryAnalytics:
                     st.write(f"Rata-rata: {summary['avg_quantity']:.1f}")
             
             # Daily movement trend
-            if movement_data['daily_movement']:
+            if not movement_data['daily_df'].empty:
                 st.subheader("Tren Harian")
                 
-                # Convert to DataFrame
-                daily_df = pd.DataFrame.from_dict(movement_data['daily_movement'], orient='index')
-                daily_df = daily_df.fillna(0)
-                daily_df.index = pd.to_datetime(daily_df.index)
-                daily_df = daily_df.sort_index()
-                
                 # Line chart
-                fig = px.line(daily_df, title='Tren Pergerakan Harian')
+                fig = px.line(movement_data['daily_df'], title='Tren Pergerakan Harian')
                 st.plotly_chart(fig, use_container_width=True)
         else:
             st.info("Tidak cukup data untuk analisis pergerakan")
 
+@register_invalidation
+def clear_analytics_cache():
+    """Drop cached turnover, movement and health results after inventory data changes"""
+    InventoryAnalytics.get_inventory_turnover.clear()
+    InventoryAnalytics.get_stock_movement_analysis.clear()
+    InventoryAnalytics.get_inventory_health_score.clear()
+
 def display_analytics_widget():
     """Display a compact analytics widget"""
     analytics = InventoryAnalytics()
@@ -24,7 +24,9 @@ def login_user(username, password):
             # Update last login
             update_user(user['id'], {"last_login": datetime.now().isoformat()})
             
-            # Store user info in session state
+            # Store user info in session state (drop the previous user's cached admin flag first)
+            if '_is_admin' in st.session_state:
+                del st.session_state['_is_admin']
             st.session_state['authenticated'] = True
             st.session_state['user'] = {
                 'id': user['id'],
@@ -52,6 +54,8 @@ def logout_user():
             username = st.session_state['user']['username']
             logger.info(f"User {username} logged out")
             
+        if '_is_admin' in st.session_state:
+            del st.session_state['_is_admin']
         st.session_state['authenticated'] = False
         if 'user' in st.session_state:
             del st.session_state['user']
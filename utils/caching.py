@@ -59,3 +59,20 @@ def cached(ttl_hours=1):
         
         return wrapper
     return decorator
+
+# Callbacks that drop caches derived from items/transactions; modules that cache
+# such data register here so write paths can invalidate without importing them
+_invalidation_hooks = []
+
+def register_invalidation(hook):
+    """Register a callable to run whenever inventory data changes"""
+    _invalidation_hooks.append(hook)
+    return hook
+
+def invalidate_data_caches():
+    """Run every registered invalidation hook (call after item/transaction writes)"""
+    for hook in _invalidation_hooks:
+        try:
+            hook()
+        except Exception as e:
+            logger.warning(f"Cache invalidation failed for {getattr(hook, '__name__', hook)}: {e}")
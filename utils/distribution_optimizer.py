@@ -15,6 +15,8 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+EARTH_RADIUS_KM = 6371.0088
+
 class DistributionOptimizer:
     def __init__(self):
         pass
@@ -22,6 +24,15 @@ class DistributionOptimizer:
     def calculate_distance(self, coord1: Tuple[float, float], coord2: Tuple[float, float]) -> float:
         """Calculate distance between two coordinates in km"""
         return geodesic(coord1, coord2).kilometers
+    
+    def _distance_matrix(self, coords: List[Tuple[float, float]]) -> np.ndarray:
+        """Pairwise haversine distances in km between (lat, lng) pairs, computed in one pass"""
+        lat, lng = np.radians(np.asarray(coords, dtype=np.float64)).T
+        dlat = lat[:, None] - lat[None, :]
+        dlng = lng[:, None] - lng[None, :]
+        cos_lat = np.cos(lat)
+        a = np.sin(dlat / 2) ** 2 + np.outer(cos_lat, cos_lat) * np.sin(dlng / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
         
     def optimize_delivery_route(self, destinations: List[Dict], warehouse_coord: Tuple[float, float], 
                               optimization_type: str = "distance", num_vehicles: int = 1,
@@ -86,20 +97,22 @@ class DistributionOptimizer:
 
     def _solve_tsp_nearest_neighbor(self, destinations: List[Dict], start_coord: Tuple[float, float]) -> List[Dict]:
         """Solve TSP using Nearest Neighbor algorithm"""
-        unvisited = destinations.copy()
-        current_coord = start_coord
+        # Node 0 is the start; node k is destinations[k - 1]
+        dist = self._distance_matrix([start_coord] + [
+            (d['coordinates']['lat'], d['coordinates']['lng']) for d in destinations
+        ])
+        visited = np.zeros(len(dist), dtype=bool)
+        visited[0] = True
+        current = 0
         route = []
         
-        while unvisited:
+        for _ in destinations:
             # Find nearest neighbor
-            nearest = min(unvisited, key=lambda x: self.calculate_distance(
-                current_coord, 
-                (x['coordinates']['lat'], x['coordinates']['lng'])
-            ))
+            nearest = int(np.argmin(np.where(visited, np.inf, dist[current])))
             
-            route.append(nearest)
-            unvisited.remove(nearest)
-            current_coord = (nearest['coordinates']['lat'], nearest['coordinates']['lng'])
+            route.append(destinations[nearest - 1])
+            visited[nearest] = True
+            current = nearest
             
         return route
 
@@ -110,8 +123,14 @@ class DistributionOptimizer:
         if len(route) < 3:
             return route
             
+        n = len(route)
+        dist = self._distance_matrix([warehouse_coord] + [
+            (d['coordinates']['lat'], d['coordinates']['lng']) for d in route
+        ])
+        # path[0] is the warehouse; path[k + 1] is the node of route stop k
+        path = list(range(n + 1))
+        
         improved = True
-        best_route = route.copy()
         
         # Limit iterations for performance
         max_iterations = 50
@@ -121,23 +140,23 @@ class DistributionOptimizer:
             improved = False
             iteration += 1
             
-            for i in range(len(best_route) - 1):
-                for j in range(i + 2, len(best_route)):
-                    # Create new route with swapped edges
-                    new_route = best_route[:i+1] + best_route[i+1:j+1][::-1] + best_route[j+1:]
-                    
-                    # Calculate distances
-                    current_dist = self._calculate_route_distance(best_route, warehouse_coord)
-                    new_dist = self._calculate_route_distance(new_route, warehouse_coord)
+            for i in range(n - 1):
+                for j in range(i + 2, n):
+                    # Reversing stops i+1..j only changes the two edges around the segment
+                    a, b, c = path[i + 1], path[i + 2], path[j + 1]
+                    delta = dist[a, c] - dist[a, b]
+                    if j + 1 < n:
+                        d = path[j + 2]
+                        delta += dist[b, d] - dist[c, d]
                     
-                    if new_dist < current_dist:
-                        best_route = new_route
+                    if delta < -1e-9:
+                        path[i + 2:j + 2] = path[i + 2:j + 2][::-1]
                         improved = True
                         break # Restart inner loop
                 if improved:
                     break # Restart outer loop
                     
-        return best_route
+        return [route[k - 1] for k in path[1:]]
 
     def _solve_vrp_with_ortools(self, destinations: List[Dict], warehouse_coord: Tuple, 
                                 num_vehicles: int, vehicle_capacity: float) -> Dict:
@@ -151,12 +170,7 @@ class DistributionOptimizer:
         ]
         
         # Distance matrix
-        size = len(locations)
-        dist_matrix = np.zeros((size, size))
-        for i in range(size):
-            for j in range(size):
-                if i != j:
-                    dist_matrix[i][j] = self.calculate_distance(locations[i], locations[j]) * 1000 # meters
+        dist_matrix = self._distance_matrix(locations) * 1000 # meters
         
         data['distance_matrix'] = dist_matrix
         data['demands'] = [0] + [d.get('weight_kg', 0) for d in destinations]
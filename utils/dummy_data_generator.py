@@ -10,7 +10,7 @@ class DummyDataGenerator:
     
     def __init__(self, db_path="inventory_new.db"):
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
+        self.conn = sqlite3.connect(db_path, uri=db_path.startswith("file:"))
         self.cursor = self.conn.cursor()
         
         # Sample data pools
@@ -425,6 +425,9 @@ class DummyDataGenerator:
         print("🌾 Generating dummy data for agricultural inventory system...")
         
         try:
+            # One explicit transaction for all tables; commit/rollback below
+            self.conn.execute("BEGIN")
+            
             # Generate data in order of dependencies
             print("Generating warehouses...")
             self.generate_warehouses()
@@ -457,6 +460,12 @@ class DummyDataGenerator:
             self.generate_notifications(150)
             
             self.conn.commit()
+            
+            # The connection does not enforce foreign keys, so validate the load once here
+            violations = self.conn.execute("PRAGMA foreign_key_check").fetchall()
+            if violations:
+                print(f"⚠️  Foreign key check: {len(violations)} violations")
+            
             print("✅ Dummy data generation completed successfully!")
             
             # Print summary
@@ -10,7 +10,7 @@ class SafeDummyDataGenerator:
     
     def __init__(self, db_path="inventory_new.db"):
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
+        self.conn = sqlite3.connect(db_path, uri=db_path.startswith("file:"))
         self.cursor = self.conn.cursor()
         
         # Smaller dataset for safe simulation
@@ -272,6 +272,9 @@ class SafeDummyDataGenerator:
         print("🌾 Generating safe simulation data for agricultural inventory system...")
         
         try:
+            # One explicit transaction for all tables; commit/rollback below
+            self.conn.execute("BEGIN")
+            
             # Check existing data first
             existing = self.check_existing_data()
             print(f"📊 Existing data: {existing}")
@@ -133,6 +133,21 @@ class InventoryRecommendation:
             # Get all categories
             categories = items_collection.distinct('category')
             
+            # Consumption for last 30 days, summed per category in the database
+            thirty_days_ago = datetime.now() - timedelta(days=30)
+            consumption_by_category = {
+                row['_id']: row for row in transactions_collection.aggregate([
+                    {'$match': {'transaction_type': 'issue', 'transaction_date': {'$gte': thirty_days_ago}}},
+                    {'$lookup': {'from': 'items', 'localField': 'item_id', 'foreignField': '_id', 'as': 'item'}},
+                    {'$unwind': '$item'},
+                    {'$group': {
+                        '_id': '$item.category',
+                        'total_consumed': {'$sum': '$quantity'},
+                        'transactions': {'$sum': 1}
+                    }}
+                ])
+            }
+            
             category_analysis = {}
             
             for category in categories:
@@ -145,17 +160,8 @@ class InventoryRecommendation:
                     low_stock_items = len([item for item in category_items if item['current_stock'] <= item['min_stock']])
                     total_stock_value = sum(item.get('unit_price', 0) * item['current_stock'] for item in category_items)
                     
-                    # Get consumption for last 30 days
-                    thirty_days_ago = datetime.now() - timedelta(days=30)
-                    item_ids = [item['_id'] for item in category_items]
-                    
-                    consumption_data = list(transactions_collection.find({
-                        'item_id': {'$in': item_ids},
-                        'transaction_type': 'issue',
-                        'transaction_date': {'$gte': thirty_days_ago}
-                    }))
-                    
-                    total_consumed = sum(t['quantity'] for t in consumption_data)
+                    consumption = consumption_by_category.get(category, {})
+                    total_consumed = consumption.get('total_consumed', 0)
                     
                     category_analysis[category] = {
                         'total_items': total_items,
@@ -163,7 +169,7 @@ class InventoryRecommendation:
                         'low_stock_percentage': (low_stock_items / total_items * 100) if total_items > 0 else 0,
                         'total_stock_value': total_stock_value,
                         'total_consumed_30d': total_consumed,
-                        'avg_daily_consumption': total_consumed / 30 if consumption_data else 0
+                        'avg_daily_consumption': total_consumed / 30 if consumption.get('transactions') else 0
                     }
             
             return category_analysis
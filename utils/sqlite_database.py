@@ -8,12 +8,18 @@ import uuid
 from typing import Dict, List, Optional, Any
 import bcrypt
 import logging
-from utils.caching import cached
+from utils.caching import cached, invalidate_data_caches
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Covering index for the analytics rollup (date range, grouped by type/item, summed quantity)
+TRANSACTION_ROLLUP_INDEX_SQL = (
+    'CREATE INDEX IF NOT EXISTS idx_transactions_date_type_item '
+    'ON inventory_transactions(transaction_date, transaction_type, item_id, quantity)'
+)
+
 class SQLiteDatabase:
     """SQLite database manager for agricultural inventory system"""
     
@@ -25,8 +31,16 @@ class SQLiteDatabase:
     def _get_connection(self):
         """Get database connection"""
         if self.conn is None:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            # "file:" URIs allow e.g. file::memory:?cache=shared for tests
+            self.conn = sqlite3.connect(self.db_path, check_same_thread=False, uri=self.db_path.startswith("file:"))
             self.conn.row_factory = sqlite3.Row  # Enable dictionary-like access
+            # WAL persists in the database file; it does not apply to :memory:
+            if self.db_path != ":memory:":
+                self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("PRAGMA temp_store=MEMORY")
+            self.conn.execute("PRAGMA cache_size=-65536")
+            self.conn.execute("PRAGMA busy_timeout=30000")
         return self.conn
     
     def _initialize_database(self):
@@ -268,6 +282,9 @@ class SQLiteDatabase:
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_distributions_status ON distributions(status)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_farmers_location ON farmers(location)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_merchants_location ON merchants(location)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_items_warehouse_id ON items(warehouse_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_harvests_warehouse_id ON harvests(warehouse_id)')
+        cursor.execute(TRANSACTION_ROLLUP_INDEX_SQL)
         
         # Migration: Add missing columns to existing tables for backward compatibility
         # Farmers table migrations
@@ -876,6 +893,7 @@ def create_item(name, category, current_stock, min_stock, max_stock, unit, price
         ''', (str(uuid.uuid4()), name, category, current_stock, min_stock, max_stock, unit, price_per_unit, warehouse_id, expiry_date, harvest_season))
         
         conn.commit()
+        invalidate_data_caches()
         logger.info(f"Item {name} created successfully")
         return True, f"Item {name} created successfully"
         
@@ -901,6 +919,7 @@ def update_item(item_id, update_data):
         ''', values)
         
         conn.commit()
+        invalidate_data_caches()
         
         if cursor.rowcount > 0:
             logger.info(f"Item {item_id} updated successfully")
@@ -922,6 +941,7 @@ def delete_item(item_id):
         
         cursor.execute("DELETE FROM items WHERE id = ?", (item_id,))
         conn.commit()
+        invalidate_data_caches()
         
         if cursor.rowcount > 0:
             logger.info(f"Item {item_id} deleted successfully")